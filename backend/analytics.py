@@ -0,0 +1,206 @@
+import asyncio
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+def _normalize(answer) -> str:
+    return " ".join(str(answer or "").lower().split())
+
+
+def grade_answer(question: dict, answer) -> bool:
+    """MCQs must match the correct option exactly; open answers are compared ignoring case and spacing."""
+    if question.get("type") == "mcq":
+        return answer == question.get("answer")
+    return bool(question.get("answer")) and _normalize(answer) == _normalize(question.get("answer"))
+
+
+class StatsAccumulator:
+    """
+    Running counters, coalesced in memory and written with one $inc upsert per key.
+    When a whole class submits at once, hundreds of attempts touching the same question
+    and topic counters turn into a handful of bulk writes every 'flush_interval' seconds.
+    """
+
+    def __init__(self, db, flush_interval: float = 1.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._pending = {}  # (collection, key) -> (Counter of increments, fields to $max)
+        self._timer = None
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+
+    def add(self, collection: str, key, increments: dict, latest: dict = None):
+        counts, maxes = self._pending.setdefault((collection, _freeze(key)), (Counter(), {}))
+        counts.update(increments)
+        for field, value in (latest or {}).items():
+            if field not in maxes or value > maxes[field]:
+                maxes[field] = value
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._schedule_flush)
+
+    def _schedule_flush(self):
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            operations = {}
+            for (collection, key), (counts, maxes) in pending.items():
+                update = {"$inc": dict(counts)}
+                if maxes:
+                    update["$max"] = maxes
+                operations.setdefault(collection, []).append(UpdateOne({"_id": _thaw(key)}, update, upsert=True))
+            for collection, ops in operations.items():
+                try:
+                    await self.db[collection].bulk_write(ops, ordered=False)
+                except Exception as e:
+                    print(f"Updating {collection} counters failed: {e}")
+
+
+def _freeze(key):
+    # Field order is kept: MongoDB compares embedded _id documents field by field
+    return tuple(key.items()) if isinstance(key, dict) else key
+
+
+def _thaw(key):
+    return dict(key) if isinstance(key, tuple) else key
+
+
+class AttemptRecorder:
+    """
+    Grades exam attempts and keeps the analytics collections up to date:
+      question_stats        one per question: attempts, correct. Exam questions only have ids
+                            within their exam, so they are keyed by (exam_id, question_id);
+                            bank questions by their ObjectId string.
+      topic_performance     one per (topic, subtopic): answered, correct
+      student_stats         one per student: attempts, answered, correct, xp, last_attempt_at
+      student_topic_stats   one per (student, topic): answered, correct
+    Attempt documents go through 'attempt_writer' (a BulkWriter) and the counters through a
+    StatsAccumulator, so submissions never wait on per-answer writes.
+    """
+
+    def __init__(self, db, attempt_writer, stats: StatsAccumulator, answer_key_cache_size: int = 256):
+        self.db = db
+        self.attempt_writer = attempt_writer
+        self.stats = stats
+        self.answer_key_cache_size = answer_key_cache_size
+        self._answer_keys = OrderedDict()
+
+    async def _exam_answer_key(self, exam_id: str) -> dict:
+        """Questions of an exam by id. Exams don't change once created, so keys are cached."""
+        if exam_id in self._answer_keys:
+            self._answer_keys.move_to_end(exam_id)
+            return self._answer_keys[exam_id]
+
+        exam = await self.db.exams.find_one(
+            {"_id": ObjectId(exam_id)},
+            {"questions.id": 1, "questions.answer": 1, "questions.type": 1, "questions.topic": 1, "questions.subtopic": 1},
+        )
+        if exam is None:
+            raise LookupError(f"Exam {exam_id} not found")
+        key = {q["id"]: q for q in exam.get("questions", []) if q.get("id")}
+
+        self._answer_keys[exam_id] = key
+        while len(self._answer_keys) > self.answer_key_cache_size:
+            self._answer_keys.popitem(last=False)
+        return key
+
+    async def _bank_answer_key(self, question_ids: list) -> dict:
+        object_ids = [ObjectId(qid) for qid in question_ids if ObjectId.is_valid(qid)]
+        cursor = self.db.questions.find(
+            {"_id": {"$in": object_ids}},
+            {"answer": 1, "type": 1, "topic": 1, "subtopic": 1},
+        )
+        return {str(doc["_id"]): doc async for doc in cursor}
+
+    async def record_many(self, attempts: list) -> list:
+        """
+        Grades a batch of attempts (dicts with student_id, exam_id, answers: [{question_id, answer}])
+        and returns a result per attempt. Answer keys are loaded once per exam for the whole batch.
+        Each question counts once per attempt (its last answer), and attempts on an exam are
+        graded only on that exam's questions; answers to anything else are ignored.
+        """
+        exam_keys = {}
+        for attempt in attempts:
+            exam_id = attempt.get("exam_id")
+            if exam_id and exam_id not in exam_keys:
+                exam_keys[exam_id] = await self._exam_answer_key(exam_id)
+
+        # Latest answer per question, in the order questions were first answered
+        answer_sets = [{a["question_id"]: a.get("answer") for a in attempt["answers"]} for attempt in attempts]
+
+        # Questions answered outside of an exam come from the bank in one query
+        loose = {
+            question_id
+            for attempt, answers in zip(attempts, answer_sets)
+            if not attempt.get("exam_id")
+            for question_id in answers
+        }
+        bank_key = await self._bank_answer_key(list(loose)) if loose else {}
+
+        now = datetime.utcnow()
+        docs = []
+        results = []
+        for attempt, answers in zip(attempts, answer_sets):
+            answer_key = exam_keys[attempt["exam_id"]] if attempt.get("exam_id") else bank_key
+            graded = []
+            for question_id, answer in answers.items():
+                question = answer_key.get(question_id)
+                if question is None:
+                    continue
+                graded.append((question_id, question, answer, grade_answer(question, answer)))
+
+            score = sum(1 for *_, correct in graded if correct)
+            total = len(answer_key) if attempt.get("exam_id") else len(graded)
+            xp = 10 * score
+            docs.append({
+                "student_id": attempt["student_id"],
+                "exam_id": attempt.get("exam_id"),
+                "answers": [{"question_id": qid, "answer": answer, "correct": correct} for qid, _, answer, correct in graded],
+                "score": score,
+                "total": total,
+                "duration_seconds": attempt.get("duration_seconds"),
+                "submitted_at": now,
+            })
+            results.append({
+                "score": score,
+                "total": total,
+                "xp": xp,
+                "results": [
+                    {"question_id": qid, "correct": correct, "correct_answer": question.get("answer")}
+                    for qid, question, _, correct in graded
+                ],
+            })
+            # Normalized so the key matches however the client spelled the id
+            exam_id = str(ObjectId(attempt["exam_id"])) if attempt.get("exam_id") else None
+            self._count(attempt["student_id"], exam_id, graded, score, xp, now)
+
+        for result, attempt_id in zip(results, self.attempt_writer.add(docs)):
+            result["attempt_id"] = str(attempt_id)
+        return results
+
+    def _count(self, student_id: str, exam_id, graded: list, score: int, xp: int, now: datetime):
+        self.stats.add(
+            "student_stats", student_id,
+            {"attempts": 1, "answered": len(graded), "correct": score, "xp": xp},
+            latest={"last_attempt_at": now},
+        )
+        for qid, question, _, correct in graded:
+            key = {"exam_id": exam_id, "question_id": qid} if exam_id else qid
+            self.stats.add("question_stats", key, {"attempts": 1, "correct": int(correct)})
+            topic = question.get("topic") or "General"
+            subtopic = question.get("subtopic") or "Miscellaneous"
+            self.stats.add("topic_performance", {"topic": topic, "subtopic": subtopic}, {"answered": 1, "correct": int(correct)})
+            self.stats.add("student_topic_stats", {"student_id": student_id, "topic": topic}, {"answered": 1, "correct": int(correct)})
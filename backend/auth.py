@@ -1,7 +1,16 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from database import db
 
 # Secret key (in production, use environment variable)
 SECRET_KEY = "your-secret-key-keep-it-secret" 
@@ -16,6 +25,16 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt is deliberately slow (hundreds of ms per hash), so it runs on a small dedicated
+# pool instead of the event loop; a burst of logins queues here without stalling other requests
+hash_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AUTH_HASH_WORKERS", "4")), thread_name_prefix="auth-hash")
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(hash_pool, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await asyncio.get_running_loop().run_in_executor(hash_pool, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -25,3 +44,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+class VerifiedTokenCache:
+    """
+    Remembers tokens whose signature was verified, with the user record they belong to,
+    for at most 'ttl' seconds (never past the token's own expiry).
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token: str, user: dict, token_exp: float):
+        with self._lock:
+            self._entries[token] = (user, min(time.time() + self.ttl, token_exp))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
+token_cache = VerifiedTokenCache(ttl=float(os.getenv("AUTH_TOKEN_CACHE_TTL", "60")))
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    FastAPI dependency returning the signed-in user's record (without the password hash).
+    Verified tokens are cached briefly, so protected endpoints don't decode the JWT
+    and read the user from MongoDB on every request.
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    email = payload.get("sub")
+    if email is None:
+        raise credentials_exception
+
+    user = await db.users.find_one({"email": email}, {"hashed_password": 0})
+    if user is None:
+        raise credentials_exception
+    user["id"] = str(user.pop("_id"))
+
+    token_cache.set(token, user, payload.get("exp", time.time()))
+    return user
@@ -0,0 +1,64 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batches. Items submitted within 'max_wait' seconds
+    of each other (up to 'max_batch' of them) are passed together to 'handler', an async
+    function that takes a list of items and returns a list of results in the same order.
+    Requests with the same key while one is already waiting or running share its result.
+    """
+
+    def __init__(self, handler, max_batch: int = 16, max_wait: float = 0.01):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = {}  # key -> (item, future), waiting for the next batch
+        self._running = {}  # key -> future, in a batch being processed
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, key, item):
+        future = self._pending.get(key, (None, None))[1] or self._running.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = (item, future)
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait, self._dispatch)
+        # Shielded: one caller going away must not cancel the result for the others
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        self._running.update((key, future) for key, (_, future) in batch.items())
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict):
+        keys = list(batch)
+        try:
+            results = await self.handler([batch[key][0] for key in keys])
+        except Exception as e:
+            for key in keys:
+                future = batch[key][1]
+                if not future.done():
+                    future.set_exception(e)
+                    # Marks the exception as retrieved in case every caller went away
+                    future.exception()
+        else:
+            for key, result in zip(keys, results):
+                future = batch[key][1]
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            for key in keys:
+                self._running.pop(key, None)
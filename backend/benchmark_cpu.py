@@ -0,0 +1,146 @@
+"""
+Compares fp32 and dynamic int8 CPU inference for the question generator, summarizer and tutor.
+
+Each (model, variant) pair runs in a fresh process so resident memory is measured cleanly.
+The report lists load time, weight size, resident memory, median/p90 latency and how closely
+the int8 outputs agree with fp32 (exact match rate and mean token F1).
+
+    python benchmark_cpu.py --runs 5 --threads 4 --output cpu_report.md
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from collections import Counter
+
+SAMPLE_TEXTS = [
+    "Photosynthesis is the process by which green plants use sunlight to synthesize food from carbon dioxide "
+    "and water. It takes place mainly in the chloroplasts of leaf cells, which contain the pigment chlorophyll. "
+    "Oxygen is released as a by-product of the reaction.",
+    "A hash table stores key-value pairs in an array of buckets. A hash function maps each key to a bucket index, "
+    "so lookups take constant time on average. Collisions are resolved with chaining or open addressing.",
+    "The French Revolution began in 1789 and ended the absolute monarchy in France. It was driven by financial "
+    "crisis, inequality between the estates and the ideas of the Enlightenment, and it led to the rise of Napoleon.",
+    "Newton's second law states that the force acting on an object equals its mass times its acceleration. "
+    "A larger force produces a larger acceleration, while a heavier object accelerates less under the same force.",
+]
+
+SAMPLE_ANSWERS = ["chlorophyll", "hash function", "Napoleon", "acceleration"]
+
+MODELS = ("generator", "summarizer", "tutor")
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS on platforms without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load(model: str, quantize: bool):
+    if model == "generator":
+        from src.generator import QuestionGenerator
+        generator = QuestionGenerator(quantize=quantize)
+        return generator.model, lambda i: generator.generate_for_answers([SAMPLE_ANSWERS[i]], SAMPLE_TEXTS[i])[0]
+    if model == "summarizer":
+        from src.summarizer import Summarizer
+        summarizer = Summarizer(quantize=quantize)
+        return summarizer.summarizer.model, lambda i: summarizer.summarize(SAMPLE_TEXTS[i], max_length=60, min_length=10)
+    if model == "tutor":
+        from src.tutor import SocraticTutor
+        tutor = SocraticTutor(quantize=quantize)
+        return tutor.model.model, lambda i: tutor.generate_hint("What does this passage describe?", "nothing", SAMPLE_ANSWERS[i], SAMPLE_TEXTS[i])
+    raise ValueError(f"Unknown model: {model}")
+
+
+def _run_case(model: str, quantize: bool, runs: int, threads: int) -> dict:
+    import torch
+    from src.cpu_inference import model_size_mb
+
+    if threads:
+        torch.set_num_threads(threads)
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    module, infer = _load(model, quantize)
+    load_seconds = time.perf_counter() - started
+
+    # Warm-up, then timed runs; the generator samples, so seed each call for comparable outputs
+    torch.manual_seed(0)
+    infer(0)
+    latencies, outputs = [], []
+    for run in range(runs):
+        for i in range(len(SAMPLE_TEXTS)):
+            torch.manual_seed(i)
+            t0 = time.perf_counter()
+            output = infer(i)
+            latencies.append(time.perf_counter() - t0)
+            if run == 0:
+                outputs.append(output)
+
+    latencies.sort()
+    return {
+        "load_seconds": load_seconds,
+        "size_mb": model_size_mb(module),
+        "rss_mb": _rss_mb() - rss_before,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p90_ms": latencies[int(0.9 * (len(latencies) - 1))] * 1000,
+        "outputs": outputs,
+    }
+
+
+def _token_f1(a: str, b: str) -> float:
+    a_tokens, b_tokens = a.lower().split(), b.lower().split()
+    if not a_tokens or not b_tokens:
+        return float(a_tokens == b_tokens)
+    common = sum((Counter(a_tokens) & Counter(b_tokens)).values())
+    if not common:
+        return 0.0
+    precision, recall = common / len(b_tokens), common / len(a_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fp32 vs int8 CPU inference benchmark")
+    parser.add_argument("--models", default=",".join(MODELS), help="Comma separated subset of: " + ", ".join(MODELS))
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes over the sample texts")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--output", help="Also write the report to this markdown file")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    lines = [
+        "| Model | Variant | Load (s) | Weights (MB) | RSS (MB) | Median (ms) | p90 (ms) | Exact match | Token F1 |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for model in [m.strip() for m in args.models.split(",") if m.strip()]:
+        results = {}
+        for quantize in (False, True):
+            print(f"Benchmarking {model} ({'int8' if quantize else 'fp32'})...")
+            with ctx.Pool(1) as pool:
+                results[quantize] = pool.apply(_run_case, (model, quantize, args.runs, args.threads))
+
+        reference = results[False]["outputs"]
+        for quantize, r in results.items():
+            pairs = list(zip(reference, r["outputs"]))
+            exact = sum(a == b for a, b in pairs) / len(pairs)
+            f1 = sum(_token_f1(a, b) for a, b in pairs) / len(pairs)
+            lines.append(
+                f"| {model} | {'int8' if quantize else 'fp32'} | {r['load_seconds']:.1f} | {r['size_mb']:.0f} | "
+                f"{r['rss_mb']:.0f} | {r['median_ms']:.0f} | {r['p90_ms']:.0f} | {exact:.0%} | {f1:.2f} |"
+            )
+        speedup = results[False]["median_ms"] / max(results[True]["median_ms"], 1e-9)
+        print(f"{model}: int8 median latency is {speedup:.2f}x faster than fp32")
+
+    report = "\n".join(lines)
+    print("\n" + report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+# Error code MongoDB reports for an _id that already exists
+DUPLICATE_KEY = 11000
+
+
+class BulkWriter:
+    """
+    Write-behind buffer for one collection. Documents are collected and written with
+    unordered insert_many once 'max_batch' are waiting or 'flush_interval' seconds
+    have passed, whichever comes first. Ids are assigned up front, so callers can
+    hand them to clients before the write happens. If a write fails (e.g. MongoDB is
+    unreachable) the unwritten documents stay buffered and are retried every
+    'retry_interval' seconds; flush() still raises, so callers waiting on it know.
+    """
+
+    def __init__(self, collection, max_batch: int = 500, flush_interval: float = 1.0, on_flush=None,
+                 retry_interval: float = 5.0):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        # Optional coroutine function called after each flush with the documents actually written
+        self.on_flush = on_flush
+        self._buffer = []
+        self._timer = None
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+
+    def add(self, docs: list) -> list:
+        """Queues documents for writing and returns their ObjectIds."""
+        ids = []
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            ids.append(doc["_id"])
+        self._buffer.extend(docs)
+
+        if len(self._buffer) >= self.max_batch:
+            self._schedule_flush()
+        elif self._buffer:
+            self._arm_timer(self.flush_interval)
+        return ids
+
+    def _arm_timer(self, delay: float):
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(delay, self._schedule_flush)
+
+    def _schedule_flush(self):
+        task = asyncio.create_task(self._background_flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _background_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Writing to {self.collection.name} failed, retrying in {self.retry_interval}s: {e}")
+
+    async def flush(self):
+        """Writes everything buffered so far."""
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            written = []
+            error = None
+            for start in range(0, len(batch), self.max_batch):
+                part = batch[start:start + self.max_batch]
+                try:
+                    await self.collection.insert_many(part, ordered=False)
+                    written.extend(part)
+                except BulkWriteError as e:
+                    # Unordered: the rest of the batch is still written. An existing _id means
+                    # the document was written by an earlier attempt that failed part-way.
+                    errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+                    if errors:
+                        print(f"Bulk insert into {self.collection.name} had {len(errors)} errors")
+                    failed = {error["index"] for error in errors}
+                    written.extend(doc for i, doc in enumerate(part) if i not in failed)
+                except Exception as e:
+                    # Keep what wasn't written (ahead of anything added since) and retry later
+                    self._buffer[:0] = batch[start:]
+                    self._arm_timer(self.retry_interval)
+                    error = e
+                    break
+
+            if self.on_flush is not None and written:
+                try:
+                    await self.on_flush(written)
+                except Exception as e:
+                    print(f"Post-flush hook for {self.collection.name} failed: {e}")
+
+            if error is not None:
+                raise error
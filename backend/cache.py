@@ -0,0 +1,137 @@
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional, Union
+
+# MongoDB rejects documents over 16MB; anything close to that stays memory-only
+MAX_STORED_BYTES = 15 * 1024 * 1024
+
+
+def content_hash(data: Union[bytes, str]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(kind: str, digest: str, **params) -> str:
+    """
+    Builds a cache key such as 'questions:<sha256>:mode=mcq:model=t5:num_questions=5'.
+    Parameters are sorted so the same arguments always produce the same key.
+    """
+    parts = [kind, digest] + [f"{name}={params[name]}" for name in sorted(params)]
+    return ":".join(str(p) for p in parts)
+
+
+def _size_of(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class LRUCache:
+    """In-memory LRU that evicts by the approximate serialized size of its values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def set(self, key: str, value: Any, size: Optional[int] = None):
+        size = _size_of(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+
+class GenerationCache:
+    """
+    Two-tier cache for extracted text, summaries and generated question sets.
+    Lookups hit the in-memory LRU first and fall back to a MongoDB collection,
+    so results survive restarts and are shared between workers. Stored entries expire
+    CACHE_TTL_DAYS after they were written (TTL index created by ensure_indexes).
+    """
+
+    def __init__(self, collection=None, max_bytes: int = 64 * 1024 * 1024):
+        self.collection = collection
+        self.memory = LRUCache(max_bytes)
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            # Hand out copies so callers can't mutate what is cached
+            return copy.deepcopy(value)
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": key})
+            except Exception as e:
+                print(f"Cache lookup failed for {key}: {e}")
+                doc = None
+            if doc is not None:
+                self.store_hits += 1
+                self.memory.set(key, doc["value"])
+                return copy.deepcopy(doc["value"])
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        value = copy.deepcopy(value)
+        size = _size_of(value)
+        self.memory.set(key, value, size=size)
+
+        if self.collection is not None and size <= MAX_STORED_BYTES:
+            try:
+                await self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "value": value, "updated_at": datetime.utcnow()},
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f"Cache write failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.store_hits) / lookups if lookups else 0.0,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+        }
+
+
+def cache_ttl_from_env() -> int:
+    """Seconds a persisted entry lives after it was last written (CACHE_TTL_DAYS, default 30; 0 keeps entries forever)."""
+    return int(float(os.getenv("CACHE_TTL_DAYS", "30")) * 24 * 3600)
+
+
+def cache_from_env(collection=None) -> GenerationCache:
+    """Builds the cache, sized by CACHE_MAX_MB. CACHE_PERSIST=0 keeps it memory-only."""
+    max_bytes = int(os.getenv("CACHE_MAX_MB", "64")) * 1024 * 1024
+    if os.getenv("CACHE_PERSIST", "1") == "0":
+        collection = None
+    return GenerationCache(collection=collection, max_bytes=max_bytes)
@@ -0,0 +1,94 @@
+from datetime import datetime
+from pymongo import UpdateOne
+
+from cache import LRUCache, content_hash
+
+
+class ChunkStore:
+    """
+    Source text chunks stored once each, keyed by their content hash ('chunk_id').
+    Questions and exams keep only the chunk_id; the text is looked up when an
+    endpoint actually needs it. Recently read chunks are kept in memory.
+    """
+
+    def __init__(self, collection, max_bytes: int = 8 * 1024 * 1024):
+        self.collection = collection
+        self.memory = LRUCache(max_bytes)
+
+    async def put_many(self, texts: list) -> list:
+        """Stores the chunks that aren't stored yet and returns the chunk_id of each text."""
+        ids = [content_hash(text) for text in texts]
+        unique = dict(zip(ids, texts))
+        if unique:
+            now = datetime.utcnow()
+            await self.collection.bulk_write(
+                [
+                    UpdateOne({"_id": chunk_id}, {"$setOnInsert": {"text": text, "created_at": now}}, upsert=True)
+                    for chunk_id, text in unique.items()
+                ],
+                ordered=False,
+            )
+            for chunk_id, text in unique.items():
+                self.memory.set(chunk_id, text, size=len(text))
+        return ids
+
+    async def get_many(self, chunk_ids: list) -> dict:
+        """Returns {chunk_id: text} for the ids that exist."""
+        found = {}
+        missing = []
+        for chunk_id in set(filter(None, chunk_ids)):
+            text = self.memory.get(chunk_id)
+            if text is None:
+                missing.append(chunk_id)
+            else:
+                found[chunk_id] = text
+        if missing:
+            async for doc in self.collection.find({"_id": {"$in": missing}}):
+                found[doc["_id"]] = doc["text"]
+                self.memory.set(doc["_id"], doc["text"], size=len(doc["text"]))
+        return found
+
+    async def get(self, chunk_id: str):
+        return (await self.get_many([chunk_id])).get(chunk_id)
+
+    async def normalize(self, collection, batch_size: int = 500) -> int:
+        """
+        Moves embedded 'context' text out of older documents in 'collection' into the
+        chunk store, replacing it with a chunk_id. Returns the number of documents updated.
+        """
+        updated = 0
+        while True:
+            docs = await collection.find({"context": {"$exists": True}}, {"context": 1}).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                return updated
+            chunk_ids = await self.put_many([doc["context"] or "" for doc in docs])
+            await collection.bulk_write(
+                [
+                    UpdateOne({"_id": doc["_id"]}, {"$set": {"chunk_id": chunk_id}, "$unset": {"context": ""}})
+                    for doc, chunk_id in zip(docs, chunk_ids)
+                ],
+                ordered=False,
+            )
+            updated += len(docs)
+
+    async def normalize_exams(self, collection, batch_size: int = 100) -> int:
+        """
+        Same as normalize() for exams, whose questions are embedded in 'questions'.
+        Returns the number of exams updated.
+        """
+        updated = 0
+        while True:
+            exams = await collection.find({"questions.context": {"$exists": True}}, {"questions": 1}).limit(batch_size).to_list(length=batch_size)
+            if not exams:
+                return updated
+            operations = []
+            for exam in exams:
+                questions = exam["questions"]
+                with_context = [q for q in questions if "context" in q]
+                chunk_ids = await self.put_many([q["context"] or "" for q in with_context])
+                for q, chunk_id in zip(with_context, chunk_ids):
+                    q["chunk_id"] = chunk_id
+                    del q["context"]
+                operations.append(UpdateOne({"_id": exam["_id"]}, {"$set": {"questions": questions}}))
+            await collection.bulk_write(operations, ordered=False)
+            updated += len(exams)
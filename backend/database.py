@@ -1,7 +1,71 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from cache import cache_ttl_from_env
 
 # MongoDB Connection URL
 MONGO_URL = "mongodb://localhost:27017"
 
 client = AsyncIOMotorClient(MONGO_URL)
 db = client.queryquill_db
+
+async def ensure_indexes():
+    """Creates the indexes the API's queries rely on. Safe to run on every startup."""
+    # /api/questions filters by type and pages newest-first by _id
+    await db.questions.create_index([("type", ASCENDING), ("_id", DESCENDING)])
+    # Topic/subtopic filtering and per-section exam assembly
+    await db.questions.create_index([("topic", ASCENDING), ("subtopic", ASCENDING), ("type", ASCENDING)])
+    # Content hash of the chunk each question was generated from
+    await db.questions.create_index("chunk_id")
+    # Multikey index over LSH band keys, used to find near-duplicate questions in the bank
+    await db.questions.create_index("dedup_bands")
+    # A student's attempts and per-topic counters
+    await db.attempts.create_index([("student_id", ASCENDING), ("submitted_at", DESCENDING)])
+    await db.student_topic_stats.create_index("_id.student_id")
+    # Generation jobs: events are read in order per job; both expire at their 'expires_at'
+    await db.job_events.create_index([("job_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+    await db.jobs.create_index("expires_at", expireAfterSeconds=0)
+    await db.job_events.create_index("expires_at", expireAfterSeconds=0)
+    await ensure_cache_expiry(cache_ttl_from_env())
+    await ensure_unique_user_emails()
+
+
+async def ensure_cache_expiry(ttl_seconds: int):
+    """
+    Persisted generation cache entries (extracted PDF text, summaries, question sets) expire
+    'ttl_seconds' after they were written, through a TTL index on updated_at; 0 keeps them forever.
+    Changing CACHE_TTL_DAYS updates the existing index in place.
+    """
+    if ttl_seconds <= 0:
+        try:
+            await db.generation_cache.drop_index("updated_at_1")
+        except OperationFailure:
+            pass  # no TTL index to drop
+        return
+    try:
+        await db.generation_cache.create_index("updated_at", expireAfterSeconds=ttl_seconds)
+    except OperationFailure:
+        # The index exists with another expiry
+        await db.command("collMod", db.generation_cache.name, index={"keyPattern": {"updated_at": 1}, "expireAfterSeconds": ttl_seconds})
+
+
+async def ensure_unique_user_emails():
+    """
+    Unique index on users.email. Signup used to check and insert separately, so older data
+    may hold duplicate emails; the index is then skipped (logging the emails to clean up)
+    instead of keeping the server from starting.
+    """
+    duplicates = await db.users.aggregate([
+        {"$group": {"_id": "$email", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]).to_list(length=None)
+    if duplicates:
+        emails = ", ".join(str(d["_id"]) for d in duplicates)
+        print(f"Not creating the unique users.email index: duplicate accounts exist for {emails}")
+        return
+    try:
+        await db.users.create_index("email", unique=True)
+    except DuplicateKeyError as e:
+        # A duplicate signed up between the check and the index build
+        print(f"Not creating the unique users.email index: {e}")
@@ -0,0 +1,84 @@
+import asyncio
+from pymongo import UpdateOne
+
+
+class HintPrecomputer:
+    """
+    Generates tutor hints for every wrong option of newly stored MCQs in the background and
+    stores them on the question as 'hints': [{"answer": <wrong option>, "hint": ...}], so
+    /api/tutor/hint can answer with a database lookup. 'generate' is an async function that
+    takes a list of (question, wrong answer, correct answer, context) tuples and returns hints.
+    Questions that only reference their source text by chunk_id get it from 'chunk_store'.
+    """
+
+    def __init__(self, collection, generate, chunk_store=None, batch_size: int = 16):
+        self.collection = collection
+        self.generate = generate
+        self.chunk_store = chunk_store
+        self.batch_size = batch_size
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def schedule(self, questions: list):
+        for q in questions:
+            if q.get("type") == "mcq" and q.get("options") and "_id" in q:
+                self._queue.put_nowait(q)
+        if self._task is None and not self._queue.empty():
+            self._task = asyncio.create_task(self._worker())
+
+    @staticmethod
+    def _requests(question: dict, context: str = "") -> list:
+        return [
+            (question["text"], option, question["answer"], question.get("context") or context)
+            for option in question["options"]
+            if option != question["answer"]
+        ]
+
+    async def _worker(self):
+        while True:
+            # Take whole questions until the batch holds about batch_size hint prompts
+            questions = [await self._queue.get()]
+            size = len(self._requests(questions[0]))
+            while size < self.batch_size and not self._queue.empty():
+                questions.append(self._queue.get_nowait())
+                size += len(self._requests(questions[-1]))
+
+            contexts = {}
+            if self.chunk_store is not None:
+                try:
+                    contexts = await self.chunk_store.get_many([q.get("chunk_id") for q in questions])
+                except Exception as e:
+                    print(f"Loading hint contexts failed, generating without them: {e}")
+
+            requests = [(q, r) for q in questions for r in self._requests(q, contexts.get(q.get("chunk_id"), ""))]
+            if not requests:
+                continue
+            try:
+                hints = await self.generate([r for _, r in requests])
+            except Exception as e:
+                print(f"Hint precompute failed for {len(questions)} questions: {e}")
+                continue
+
+            by_question = {}
+            for (q, request), hint in zip(requests, hints):
+                # Failed generations are left out, so the live endpoint generates them later
+                if hint is None:
+                    continue
+                by_question.setdefault(q["_id"], []).append({"answer": request[1], "hint": hint})
+            if not by_question:
+                continue
+            try:
+                await self.collection.bulk_write(
+                    [UpdateOne({"_id": _id}, {"$set": {"hints": stored}}) for _id, stored in by_question.items()],
+                    ordered=False,
+                )
+            except Exception as e:
+                print(f"Storing precomputed hints failed: {e}")
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
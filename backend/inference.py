@@ -0,0 +1,108 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceQueueFull(Exception):
+    """Raised when a model's inference queue has no room for another request."""
+
+    def __init__(self, model_name: str, retry_after: int):
+        super().__init__(f"Inference queue for '{model_name}' is full")
+        self.model_name = model_name
+        self.retry_after = retry_after
+
+
+class ModelExecutor:
+    """
+    Runs blocking inference calls for one model on a dedicated thread pool.
+    At most max_workers calls run at once and at most max_queue more wait;
+    anything beyond that is rejected with InferenceQueueFull.
+    """
+
+    def __init__(self, name: str, max_workers: int = 1, max_queue: int = 8, retry_after: int = 5, initializer=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        # 'initializer' runs once in each worker thread (e.g. to set torch's thread count)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"inference-{name}", initializer=initializer)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise InferenceQueueFull(self.name, self.retry_after)
+            self._pending += 1
+
+        # The slot is released when the work actually finishes, even if the caller goes away
+        future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceExecutor:
+    """Keeps one ModelExecutor per model so a slow model cannot starve the others."""
+
+    def __init__(self):
+        self._executors = {}
+
+    def register(self, name: str, max_workers: int = 1, max_queue: int = 8, retry_after: int = 5, initializer=None) -> ModelExecutor:
+        executor = ModelExecutor(name, max_workers=max_workers, max_queue=max_queue, retry_after=retry_after, initializer=initializer)
+        self._executors[name] = executor
+        return executor
+
+    def register_from_env(self, name: str, max_workers: int = 1, max_queue: int = 8, retry_after: int = 5, initializer=None) -> ModelExecutor:
+        """
+        Registers a model executor, letting INFERENCE_WORKERS_<NAME>, INFERENCE_QUEUE_<NAME>
+        and INFERENCE_RETRY_AFTER override the defaults.
+        """
+        prefix = name.upper()
+        return self.register(
+            name,
+            max_workers=int(os.getenv(f"INFERENCE_WORKERS_{prefix}", max_workers)),
+            max_queue=int(os.getenv(f"INFERENCE_QUEUE_{prefix}", max_queue)),
+            retry_after=int(os.getenv("INFERENCE_RETRY_AFTER", retry_after)),
+            initializer=initializer,
+        )
+
+    async def run(self, name: str, fn, *args, **kwargs):
+        return await self._executors[name].run(fn, *args, **kwargs)
+
+    async def run_queued(self, name: str, fn, *args, **kwargs):
+        """
+        Like run(), but waits for room in the queue instead of failing.
+        Meant for background jobs that have no client waiting on a response.
+        """
+        while True:
+            try:
+                return await self.run(name, fn, *args, **kwargs)
+            except InferenceQueueFull as e:
+                await asyncio.sleep(e.retry_after)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "workers": executor.max_workers,
+                "queue_size": executor.max_queue,
+                "pending": executor.pending,
+            }
+            for name, executor in self._executors.items()
+        }
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown()
@@ -0,0 +1,194 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Finished jobs are kept around this long so clients can fetch their results
+JOB_TTL_SECONDS = 60 * 60
+
+# Jobs that never finish (their worker process died) are dropped after this long
+UNFINISHED_JOB_TTL_SECONDS = 24 * 60 * 60
+
+FINAL_EVENTS = ("done", "error")
+
+
+class Job:
+    """
+    A long running generation task, as seen by the process running it. Workers publish
+    results chunk by chunk; every change is written to MongoDB, so clients can poll the
+    job or subscribe to its event stream through any API worker.
+    """
+
+    def __init__(self, manager: "JobManager", kind: str, total: Optional[int] = None):
+        self.manager = manager
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.total = total
+        self.completed = 0
+        self.result_count = 0
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.expires_at = self.created_at + timedelta(seconds=UNFINISHED_JOB_TTL_SECONDS)
+        self.event_count = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def state(self) -> dict:
+        return {
+            "kind": self.kind,
+            "status": self.status,
+            "total_chunks": self.total,
+            "completed_chunks": self.completed,
+            "result_count": self.result_count,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+        }
+
+    async def save(self):
+        await self.manager.jobs.update_one({"_id": self.id}, {"$set": self.state()}, upsert=True)
+
+    async def _emit(self, event: dict, items: list = ()):
+        # 'start'/'end' locate the event's items within the job's results, for polling with ?since=
+        await self.manager.events.insert_one({
+            "job_id": self.id,
+            "seq": self.event_count,
+            "event": event,
+            "start": self.result_count,
+            "end": self.result_count + len(items),
+            "expires_at": self.expires_at,
+        })
+        self.result_count += len(items)
+        await self.save()
+        async with self._changed:
+            self.event_count += 1
+            self._changed.notify_all()
+
+    async def publish(self, items: list, chunk_index: int):
+        """Records the results of one processed chunk and notifies subscribers."""
+        self.completed += 1
+        await self._emit({"type": "chunk", "chunk": chunk_index, "items": items}, items)
+
+    async def set_total(self, total: int):
+        self.total = total
+        await self._emit({"type": "total", "total": total})
+
+    async def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "completed"
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self.expires_at = self.finished_at + timedelta(seconds=self.manager.ttl_seconds)
+        await self._emit({"type": "error", "detail": error} if error else {"type": "done"})
+        await self.manager.events.update_many({"job_id": self.id}, {"$set": {"expires_at": self.expires_at}})
+
+    async def wait_for_event(self, index: int, timeout: float):
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.event_count > index), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+class JobManager:
+    """
+    Runs job workers as background tasks and keeps job state in MongoDB ('jobs', plus one
+    'job_events' document per event), so with several uvicorn workers any of them can
+    answer for a job. Streams of jobs running in this process wake up on each event;
+    others poll the events collection every 'poll_interval' seconds.
+    Expired jobs and events are removed by TTL indexes on 'expires_at' (see ensure_indexes).
+    """
+
+    def __init__(self, jobs_collection, events_collection, ttl_seconds: int = JOB_TTL_SECONDS, poll_interval: float = 0.5):
+        self.jobs = jobs_collection
+        self.events = events_collection
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self._running = {}
+        self._tasks = set()
+
+    async def submit(self, kind: str, worker, total: Optional[int] = None) -> Job:
+        """
+        Starts 'worker(job)' in the background and returns the job immediately.
+        """
+        job = Job(self, kind, total=total)
+        await job.save()
+        self._running[job.id] = job
+
+        task = asyncio.create_task(self._run(job, worker))
+        # Hold a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.jobs.find_one({"_id": job_id})
+
+    async def to_dict(self, job: dict, since: int = 0) -> dict:
+        """A job's state with the results from index 'since' onward."""
+        results = []
+        cursor = self.events.find(
+            {"job_id": job["_id"], "end": {"$gt": since}, "event.type": "chunk"},
+            {"event.items": 1, "start": 1},
+        ).sort("seq", 1)
+        async for doc in cursor:
+            results.extend(doc["event"]["items"][max(0, since - doc["start"]):])
+        return {
+            "id": job["_id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "total_chunks": job["total_chunks"],
+            "completed_chunks": job["completed_chunks"],
+            "results": results,
+            "next": since + len(results),
+            "error": job["error"],
+        }
+
+    async def stream(self, job_id: str, after_event: int = -1):
+        """
+        Yields (sequence number, event) for every event after sequence number 'after_event'
+        until the job finishes. Event sequence numbers are independent of result indexes.
+        """
+        index = after_event + 1
+        while True:
+            docs = await self.events.find({"job_id": job_id, "seq": {"$gte": index}}, {"event": 1, "seq": 1}).sort("seq", 1).to_list(length=None)
+            for doc in docs:
+                yield doc["seq"], doc["event"]
+                index = doc["seq"] + 1
+                if doc["event"]["type"] in FINAL_EVENTS:
+                    return
+            if docs:
+                continue
+
+            job = self._running.get(job_id)
+            if job is not None:
+                await job.wait_for_event(index, self.poll_interval)
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: Job, worker):
+        job.status = "running"
+        try:
+            await job.save()
+            await worker(job)
+        except asyncio.CancelledError:
+            # Server shutting down: tell clients (through whichever worker they poll) the job won't finish
+            await job.finish(error="The server restarted before the job finished. Please resubmit it.")
+            raise
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            await job.finish(error=str(e))
+        else:
+            await job.finish()
+        finally:
+            self._running.pop(job.id, None)
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
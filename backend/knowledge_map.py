@@ -0,0 +1,109 @@
+import time
+from collections import Counter
+from pymongo import UpdateOne
+
+# Predefined groups for coloring
+TOPIC_GROUPS = {"Math": 1, "Science": 2, "Computer Science": 3}
+
+# Placeholder so the map still renders before any questions exist
+EMPTY_MAP = {
+    "nodes": [
+        {"id": "Start Learning", "group": 1, "val": 20, "description": "Generate some exams to populate your map!"}
+    ],
+    "links": []
+}
+
+
+class KnowledgeMap:
+    """
+    Topic/subtopic graph of the question bank, maintained incrementally.
+    'counts_collection' holds one document per (topic, subtopic) pair with the number
+    of questions in it; counters are bumped with $inc as questions are inserted, so
+    building the map reads a handful of small documents regardless of bank size.
+    The built map is cached for 'ttl' seconds (other workers may update the counters).
+    """
+
+    def __init__(self, counts_collection, ttl: float = 10.0):
+        self.counts = counts_collection
+        self.ttl = ttl
+        self._cached = None
+        self._cached_at = 0.0
+
+    def invalidate(self):
+        self._cached = None
+
+    async def record(self, questions: list):
+        """Adds newly inserted questions to the counters."""
+        pairs = Counter(
+            (q["topic"], q["subtopic"])
+            for q in questions
+            if q.get("topic") and q.get("subtopic")
+        )
+        if not pairs:
+            return
+        await self.counts.bulk_write(
+            [
+                UpdateOne({"_id": {"topic": topic, "subtopic": subtopic}}, {"$inc": {"count": n}}, upsert=True)
+                for (topic, subtopic), n in pairs.items()
+            ],
+            ordered=False,
+        )
+        self.invalidate()
+
+    async def rebuild(self, questions_collection):
+        """
+        Recomputes every counter from the questions collection with a server-side
+        aggregation; question documents (and their context text) never leave MongoDB.
+        """
+        await questions_collection.aggregate([
+            {"$match": {"topic": {"$nin": [None, ""]}, "subtopic": {"$nin": [None, ""]}}},
+            {"$group": {"_id": {"topic": "$topic", "subtopic": "$subtopic"}, "count": {"$sum": 1}}},
+            {"$out": self.counts.name},
+        ]).to_list(length=None)
+        self.invalidate()
+
+    async def ensure_backfilled(self, questions_collection):
+        """Builds the counters from existing questions the first time the server runs with them."""
+        if await self.counts.estimated_document_count() == 0 and await questions_collection.estimated_document_count() > 0:
+            await self.rebuild(questions_collection)
+
+    async def get_map(self) -> dict:
+        if self._cached is not None and time.monotonic() - self._cached_at < self.ttl:
+            return self._cached
+
+        nodes_dict = {}
+        links = []
+        async for doc in self.counts.find({}).sort([("_id.topic", 1), ("_id.subtopic", 1)]):
+            topic = doc["_id"]["topic"]
+            subtopic = doc["_id"]["subtopic"]
+            count = doc["count"]
+
+            # Add Topic Node (base size 10, growing by 2 per further question)
+            if topic not in nodes_dict:
+                nodes_dict[topic] = {
+                    "id": topic,
+                    "group": TOPIC_GROUPS.get(topic, 4),
+                    "val": 10 + 2 * (count - 1),
+                    "description": f"Core area: {topic}"
+                }
+            else:
+                nodes_dict[topic]["val"] += 2 * count
+
+            # Add Subtopic Node (base size 5, growing by 1 per further question)
+            if subtopic not in nodes_dict:
+                nodes_dict[subtopic] = {
+                    "id": subtopic,
+                    "group": TOPIC_GROUPS.get(topic, 4),
+                    "val": 5 + (count - 1),
+                    "description": f"Subtopic of {topic}"
+                }
+            else:
+                nodes_dict[subtopic]["val"] += count
+
+            # Each counter document is a distinct topic/subtopic pair, so links never repeat
+            links.append({"source": topic, "target": subtopic})
+
+        result = {"nodes": list(nodes_dict.values()), "links": links} if nodes_dict else EMPTY_MAP
+        self._cached = result
+        self._cached_at = time.monotonic()
+        return result
@@ -3,7 +3,7 @@ import sys
 from src.data_source import FileDataSource
 from src.generator import QuestionGenerator, chunk_text
 from src.mcq_engine import MCQEngine
-from difflib import SequenceMatcher
+from src.dedup import MinHashDeduplicator
 import random
 
 def main():
@@ -11,6 +11,9 @@ def main():
     parser.add_argument("input_file", help="Path to the book/text file")
     parser.add_argument("--num_questions", type=int, default=5, help="Number of questions to generate per chunk")
     parser.add_argument("--mode", choices=['qa', 'mcq'], default='mcq', help="Generation mode: 'qa' for open ended, 'mcq' for multiple choice")
+    parser.add_argument("--overlap", type=int, default=0, help="Tokens of trailing sentences repeated at the start of the next chunk")
+    parser.add_argument("--batch_size", type=int, default=8, help="Number of prompts run through the model per forward pass")
+    parser.add_argument("--quantize", action="store_true", help="Use dynamic int8 quantization for the question model (CPU)")
     
     args = parser.parse_args()
     
@@ -29,21 +32,23 @@ def main():
 
     print(f"Successfully read {len(full_text)} characters.")
     
-    # 2. Process Text
-    chunks = chunk_text(full_text)
-    print(f"Split text into {len(chunks)} chunks for processing.")
-    
-    # 3. Initialize Model
+    # 2. Initialize Model
     try:
-        generator = QuestionGenerator()
+        generator = QuestionGenerator(quantize=args.quantize)
         mcq_engine = MCQEngine()
     except Exception as e:
         print(f"Error loading model: {e}")
         sys.exit(1)
+
+    # 3. Process Text (chunk sizes are counted with the model's own tokenizer)
+    chunks = chunk_text(full_text, tokenizer=generator.tokenizer, overlap=args.overlap)
+    print(f"Split text into {len(chunks)} chunks for processing.")
         
     # 4. Generate Questions
     print("\nStarting Question Generation...\n")
     
+    dedup = MinHashDeduplicator()
+
     # meaningful limit for demo purposes (first 3 chunks)
     for i, chunk in enumerate(chunks[:3]): 
         print(f"--- Processing Chunk {i+1}/{min(len(chunks), 3)} ---")
@@ -56,36 +61,34 @@ def main():
             # 1. Get Answers
             answers = mcq_engine.get_candidate_answers(chunk, num_candidates=args.num_questions * 3) # Get more candidates to filter
             seen_questions = []
-            for ans in answers:
+            # 2. Generate Questions for Answers, one batch of prompts at a time
+            for start in range(0, len(answers), args.batch_size):
                 if len(seen_questions) >= args.num_questions:
                     break
-                # 2. Generate Question for Answer
-                question = generator.generate_for_answer(ans, chunk)
-                
-                # Deduplication check
-                is_duplicate = False
-                for existing_q in seen_questions:
-                    similarity = SequenceMatcher(None, question, existing_q).ratio()
-                    if similarity > 0.85: # Threshold for similarity
-                        is_duplicate = True
+                batch_answers = answers[start:start + args.batch_size]
+                batch_questions = generator.generate_for_answers(batch_answers, chunk, batch_size=args.batch_size)
+
+                for ans, question in zip(batch_answers, batch_questions):
+                    if len(seen_questions) >= args.num_questions:
                         break
-                
-                if is_duplicate:
-                    continue
-                    
-                seen_questions.append(question)
-                
-                # 3. Get Distractors
-                distractors = mcq_engine.get_distractors(ans, chunk)
-                options = distractors + [ans]
-                random.shuffle(options)
-                
-                # Display
-                print(f"\nQ: {question}")
-                for idx, opt in enumerate(options):
-                    prefix = "A" if idx == 0 else ("B" if idx == 1 else ("C" if idx == 2 else "D"))
-                    print(f"   {prefix}) {opt}")
-                print(f"   (Correct: {ans})")
+
+                    # Deduplication check (near-duplicates across all chunks of the book)
+                    if not dedup.check_and_add(question):
+                        continue
+
+                    seen_questions.append(question)
+
+                    # 3. Get Distractors
+                    distractors = mcq_engine.get_distractors(ans, chunk)
+                    options = distractors + [ans]
+                    random.shuffle(options)
+
+                    # Display
+                    print(f"\nQ: {question}")
+                    for idx, opt in enumerate(options):
+                        prefix = "A" if idx == 0 else ("B" if idx == 1 else ("C" if idx == 2 else "D"))
+                        print(f"   {prefix}) {opt}")
+                    print(f"   (Correct: {ans})")
             
     print("\nDone! Generated valid questions based on the text.")
 
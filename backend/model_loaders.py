@@ -0,0 +1,74 @@
+import os
+
+from src.generator import QuestionGenerator
+from src.mcq_engine import MCQEngine
+from src.distractors import DistractorEngine, TermEmbedder
+from src.topics import TopicClassifier
+from src.summarizer import Summarizer
+from src.tutor import SocraticTutor
+from src.cpu_inference import intra_op_thread_initializer, quantize_enabled
+
+# (name, worker threads, queue size) of each model's inference pool
+INFERENCE_POOLS = (("generator", 1, 4), ("summarizer", 1, 4), ("tutor", 2, 16))
+
+# Models the API calls directly; the embedder is only a dependency of mcq_engine/topic_classifier
+SERVED_MODELS = ("generator", "mcq_engine", "topic_classifier", "summarizer", "tutor")
+
+
+def lazy_models_from_env() -> set:
+    """Models listed in LAZY_MODELS (default: tutor) are loaded on first use instead of at startup."""
+    return {name.strip() for name in os.getenv("LAZY_MODELS", "tutor").split(",") if name.strip()}
+
+
+def register_inference_pools(inference, queue_scale: int = 1):
+    """
+    Registers one bounded thread pool per model. Worker/queue sizes can be tuned with
+    INFERENCE_WORKERS_<NAME> / INFERENCE_QUEUE_<NAME>, and torch's intra-op threads per
+    model with TORCH_THREADS_<NAME> (see src/cpu_inference.py).
+    """
+    for name, workers, queue in INFERENCE_POOLS:
+        inference.register_from_env(name, max_workers=workers, max_queue=queue * queue_scale,
+                                    initializer=intra_op_thread_initializer(name))
+
+
+def load_term_embedder():
+    """
+    Small embedding model shared by distractor selection and topic classification.
+    Returns None (keyword/random fallbacks) if EMBEDDINGS=0 or the model can't be loaded.
+    """
+    if os.getenv("EMBEDDINGS", "1") != "1":
+        return None
+    try:
+        return TermEmbedder(os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    except Exception as e:
+        print(f"Error loading embedding model, falling back to keyword/random heuristics: {e}")
+        return None
+
+
+def load_distractor_engine(embedder):
+    # Embedding-based distractors, unless DISTRACTOR_MODE=random or no embedder is available.
+    # DISTRACTOR_CORPUS_INDEX=1 lets small chunks borrow terms from other uploads (off by default,
+    # since those may come from unrelated documents).
+    if embedder is None or os.getenv("DISTRACTOR_MODE", "embedding") != "embedding":
+        return None
+    return DistractorEngine(embedder, use_corpus_index=os.getenv("DISTRACTOR_CORPUS_INDEX", "0") == "1")
+
+
+def register_local_models(registry, lazy: set):
+    """Registers loaders that load every model into this process."""
+    registry.register("embedder", load_term_embedder, lazy="embedder" in lazy)
+    # CPU_QUANTIZE=1 (or a list of model names) loads models with dynamic int8 linear layers
+    registry.register("generator", lambda: QuestionGenerator(quantize=quantize_enabled("generator")), lazy="generator" in lazy)
+    registry.register(
+        "mcq_engine",
+        lambda embedder: MCQEngine(distractor_engine=load_distractor_engine(embedder)),
+        depends_on=("embedder",),
+        lazy="mcq_engine" in lazy,
+    )
+    registry.register("topic_classifier", TopicClassifier, depends_on=("embedder",), lazy="topic_classifier" in lazy)
+    registry.register(
+        "summarizer",
+        lambda: Summarizer(quantize=quantize_enabled("summarizer"), batch_size=int(os.getenv("SUMMARY_BATCH_SIZE", "4"))),
+        lazy="summarizer" in lazy,
+    )
+    registry.register("tutor", lambda: SocraticTutor(quantize=quantize_enabled("tutor")), lazy="tutor" in lazy)
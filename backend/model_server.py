@@ -0,0 +1,291 @@
+"""
+Dedicated model process for running the API with several uvicorn workers.
+
+The model server loads every model once and serves method calls over a local socket;
+API workers started with MODEL_SERVER set get lightweight proxies instead of their own
+copies of the weights, so workers scale with cores while the weights stay resident once.
+
+    export MODEL_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python model_server.py                                   # listens on 127.0.0.1:8765
+    MODEL_SERVER=127.0.0.1:8765 uvicorn server:app --workers 4
+
+MODEL_SERVER may also be a Unix socket path (created with 0600 permissions). Both sides
+must share a secret MODEL_SERVER_AUTHKEY: connections exchange pickled requests, so anyone
+holding the key can run code in the model server. Neither side starts without it.
+"""
+import argparse
+import asyncio
+import functools
+import ipaddress
+import os
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+
+from inference import InferenceExecutor, InferenceQueueFull
+from registry import ModelNotReady, ModelRegistry
+from model_loaders import SERVED_MODELS, lazy_models_from_env, register_inference_pools, register_local_models
+from src.cpu_inference import configure_interop_threads
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+# Inference pool each model's calls run on inside the model server
+EXECUTOR_FOR_MODEL = {
+    "generator": "generator",
+    "mcq_engine": "generator",
+    "topic_classifier": "generator",
+    "summarizer": "summarizer",
+    "tutor": "tutor",
+}
+
+# Models whose input the API worker chunks itself, with a tokenizer of its own
+CHUNKED_MODELS = ("generator", "summarizer")
+
+
+def parse_address(address: str):
+    """'host:port' becomes a TCP address; anything else is treated as a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def authkey_from_env() -> bytes:
+    authkey = os.getenv("MODEL_SERVER_AUTHKEY")
+    if not authkey:
+        raise RuntimeError(
+            "MODEL_SERVER_AUTHKEY must be set to a secret shared by the model server and the API workers"
+        )
+    return authkey.encode()
+
+
+def is_loopback(address) -> bool:
+    if isinstance(address, str):
+        return True  # Unix socket
+    try:
+        return ipaddress.ip_address(address[0]).is_loopback
+    except ValueError:
+        return address[0] == "localhost"
+
+
+def public_attributes(model) -> dict:
+    """Plain attributes (model_name, quantized, ...) that proxies expose without a round trip."""
+    return {
+        name: value for name, value in vars(model).items()
+        if not name.startswith("_") and isinstance(value, (str, int, float, bool))
+    }
+
+
+class ModelServer:
+    """
+    Hosts a ModelRegistry behind a multiprocessing Listener. Each client connection is
+    served on its own thread; calls run on the per-model inference pools, so a full
+    queue is reported back to the API worker as InferenceQueueFull.
+    """
+
+    def __init__(self, registry: ModelRegistry, inference: InferenceExecutor, address: str, authkey: bytes):
+        self.registry = registry
+        self.inference = inference
+        self.address = address
+        self.authkey = authkey
+        self.loop = None
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.registry.start()
+        address = parse_address(self.address)
+        listener = Listener(address, authkey=self.authkey)
+        if isinstance(address, str):
+            os.chmod(address, 0o600)
+        elif not is_loopback(address):
+            print(f"Warning: the model server accepts connections from other hosts on {self.address}")
+        print(f"Model server listening on {self.address}")
+        threading.Thread(target=self._accept_loop, args=(listener,), daemon=True).start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            listener.close()
+            self.inference.shutdown()
+            self.registry.shutdown()
+
+    def _accept_loop(self, listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                # e.g. a client with the wrong authkey
+                print(f"Rejected model server connection: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = ("ok", self._dispatch(request))
+                except ModelNotReady as e:
+                    response = ("not_ready", e.model_name, e.state, e.error)
+                except InferenceQueueFull as e:
+                    response = ("busy", e.model_name, e.retry_after)
+                except Exception as e:
+                    response = ("error", f"{type(e).__name__}: {e}")
+                try:
+                    conn.send(response)
+                except OSError:
+                    return
+
+    def _await(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def _dispatch(self, request):
+        op, name = request[0], request[1]
+        if op == "load":
+            # Waits for the model, loading it first if it is lazy
+            return public_attributes(self._await(self.registry.get(name, wait=True)))
+        if op == "call":
+            _, _, method, args, kwargs = request
+            if method.startswith("_"):
+                raise AttributeError(f"'{method}' is not callable remotely")
+            fn = getattr(self.registry.loaded(name), method)
+            return self._await(self.inference.run(EXECUTOR_FOR_MODEL[name], fn, *args, **kwargs))
+        if op == "status":
+            return self.registry.status()
+        raise ValueError(f"Unknown request: {op}")
+
+
+class ModelClient:
+    """
+    Connection pool to the model server. Each concurrent call uses its own connection;
+    idle connections are reused.
+    """
+
+    def __init__(self, address: str, authkey: bytes, retry_after: int = 10, max_reconnect_delay: float = 30.0):
+        self.address = address
+        self.authkey = authkey
+        self.retry_after = retry_after
+        self.max_reconnect_delay = max_reconnect_delay
+        self._idle = queue.LifoQueue()
+        self._closed = threading.Event()
+
+    def _connect(self):
+        return Client(parse_address(self.address), authkey=self.authkey)
+
+    def _roundtrip(self, conn, request):
+        try:
+            conn.send(request)
+            return conn.recv()
+        except Exception:
+            conn.close()
+            raise
+
+    def request(self, *request):
+        try:
+            conn = self._idle.get_nowait()
+            try:
+                response = self._roundtrip(conn, request)
+            except (EOFError, OSError):
+                # Stale connection (e.g. the model server restarted); retry once on a fresh one
+                conn = self._connect()
+                response = self._roundtrip(conn, request)
+        except queue.Empty:
+            conn = self._connect()
+            response = self._roundtrip(conn, request)
+        self._idle.put(conn)
+
+        status = response[0]
+        if status == "ok":
+            return response[1]
+        if status == "not_ready":
+            raise ModelNotReady(response[1], response[2], self.retry_after, response[3])
+        if status == "busy":
+            raise InferenceQueueFull(response[1], response[2])
+        raise RuntimeError(f"Model server error: {response[1]}")
+
+    def load(self, name: str) -> "RemoteModel":
+        """
+        Blocks until the model server has the model loaded; used as a registry loader.
+        Keeps retrying while the model server is unreachable (still starting, or restarting),
+        so a slow model server never leaves the model failed in this worker.
+        """
+        delay = 1.0
+        while True:
+            try:
+                attributes = self.request("load", name)
+                break
+            except (EOFError, OSError) as e:
+                if self._closed.is_set():
+                    raise
+                print(f"Model server at {self.address} unavailable for '{name}' ({e}); retrying in {delay:.0f}s")
+            if self._closed.wait(delay):
+                raise RuntimeError("Model client closed")
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+        if name in CHUNKED_MODELS:
+            # Tokenizers are small, so each worker loads its own, here on the loader thread
+            # rather than on first use inside a request
+            from transformers import AutoTokenizer
+            attributes["chunk_tokenizer"] = AutoTokenizer.from_pretrained(attributes["model_name"])
+        return RemoteModel(self, name, attributes)
+
+    def close(self):
+        self._closed.set()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RemoteModel:
+    """Stands in for a model hosted by the model server: method calls are forwarded, plain attributes are copied."""
+
+    def __init__(self, client: ModelClient, name: str, attributes: dict):
+        self._client = client
+        self._name = name
+        self.__dict__.update(attributes)
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self._client.request("call", self._name, method, args, kwargs)
+
+        return call
+
+
+def register_remote_models(registry: ModelRegistry, client: ModelClient, lazy: set):
+    """Registers loaders that connect to models hosted by the model server."""
+    for name in SERVED_MODELS:
+        registry.register(name, functools.partial(client.load, name), lazy=name in lazy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API's models to several uvicorn workers")
+    parser.add_argument("--address", default=os.getenv("MODEL_SERVER", DEFAULT_ADDRESS), help="host:port or Unix socket path")
+    parser.add_argument("--queue_scale", type=int, default=int(os.getenv("MODEL_SERVER_QUEUE_SCALE", "4")),
+                        help="Multiplier for the per-model queue sizes (requests arrive from every worker)")
+    args = parser.parse_args()
+    # Refuse to start (before loading any model) without a shared secret
+    authkey = authkey_from_env()
+
+    configure_interop_threads()
+
+    async def run():
+        registry = ModelRegistry(max_workers=int(os.getenv("MODEL_LOAD_WORKERS", "4")))
+        register_local_models(registry, lazy_models_from_env())
+        inference = InferenceExecutor()
+        register_inference_pools(inference, queue_scale=args.queue_scale)
+        await ModelServer(registry, inference, args.address, authkey).serve()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ class QuestionBase(BaseModel):
     options: Optional[List[str]] = None
     answer: Optional[str] = None
     context: Optional[str] = None
+    chunk_id: Optional[str] = None # content hash of the source chunk (see chunk_store.py)
     topic: Optional[str] = None
     subtopic: Optional[str] = None
     timestamp: Optional[str] = None
@@ -56,6 +57,33 @@ class ExamCreate(BaseModel):
     duration: int = 30 # defaults to 30 mins
     created_by: Optional[str] = None
 
+class ExamSection(BaseModel):
+    count: int
+    topic: Optional[str] = None
+    subtopic: Optional[str] = None
+    type: Optional[str] = None # 'mcq' or 'qa'; any type if omitted
+
+class ExamAssemble(BaseModel):
+    title: str
+    description: Optional[str] = None
+    sections: List[ExamSection]
+    duration: Optional[int] = None # defaults to 2 mins per question
+    created_by: Optional[str] = None
+    exclude_used_within_days: int = 0 # skip questions put in an exam this recently
+
+class AttemptAnswer(BaseModel):
+    question_id: str
+    answer: Optional[str] = None # the chosen option's text for MCQs
+
+class AttemptCreate(BaseModel):
+    student_id: Optional[str] = None # set from the auth token; teachers may name a student in batch syncs
+    exam_id: Optional[str] = None
+    answers: List[AttemptAnswer]
+    duration_seconds: Optional[int] = None
+
+class AttemptBatch(BaseModel):
+    attempts: List[AttemptCreate]
+
 class Exam(ExamCreate):
     id: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
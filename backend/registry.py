@@ -0,0 +1,142 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelNotReady(Exception):
+    """Raised when a request needs a model that is still loading or failed to load."""
+
+    def __init__(self, model_name: str, state: str, retry_after: int, error: str = None):
+        super().__init__(f"Model '{model_name}' is {state}")
+        self.model_name = model_name
+        self.state = state
+        self.retry_after = retry_after
+        self.error = error
+
+
+class ModelSpec:
+    def __init__(self, name: str, loader, depends_on: tuple = (), lazy: bool = False):
+        self.name = name
+        self.loader = loader
+        self.depends_on = tuple(depends_on)
+        self.lazy = lazy
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.task = None
+
+
+class ModelRegistry:
+    """
+    Loads models in the background so the server can take traffic straight away.
+    Each model is loaded on a worker thread as soon as the models it depends on are
+    ready, independently of the others; a model that fails to load only affects the
+    endpoints that need it. Lazy models are loaded on first use instead of at startup.
+    """
+
+    def __init__(self, max_workers: int = 4, retry_after: int = 10):
+        self.retry_after = retry_after
+        self._specs = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-loader")
+
+    def register(self, name: str, loader, depends_on: tuple = (), lazy: bool = False):
+        """
+        Registers a model. 'loader' is a blocking callable that receives the loaded
+        values of 'depends_on', in order, and returns the model.
+        """
+        self._specs[name] = ModelSpec(name, loader, depends_on, lazy)
+
+    def start(self):
+        """Starts loading every non-lazy model (and its dependencies) without waiting."""
+        for spec in self._specs.values():
+            if not spec.lazy:
+                self._ensure_loading(spec.name)
+
+    def _ensure_loading(self, name: str) -> asyncio.Task:
+        spec = self._specs[name]
+        if spec.task is None:
+            spec.task = asyncio.create_task(self._load(spec))
+            # Failures are reported through the spec; don't warn about unretrieved exceptions
+            spec.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return spec.task
+
+    async def _load(self, spec: ModelSpec):
+        try:
+            deps = [await self._ensure_loading(dep) for dep in spec.depends_on]
+        except Exception as e:
+            spec.state = FAILED
+            spec.error = f"dependency failed: {e}"
+            raise
+
+        spec.state = LOADING
+        started = time.monotonic()
+        print(f"Loading model '{spec.name}'...")
+        try:
+            spec.value = await asyncio.get_running_loop().run_in_executor(self._pool, spec.loader, *deps)
+        except Exception as e:
+            spec.state = FAILED
+            spec.error = str(e)
+            print(f"Error loading model '{spec.name}': {e}")
+            raise
+        spec.load_seconds = round(time.monotonic() - started, 2)
+        spec.state = READY
+        print(f"Model '{spec.name}' loaded in {spec.load_seconds}s.")
+        return spec.value
+
+    def is_ready(self, name: str) -> bool:
+        return self._specs[name].state == READY
+
+    def loaded(self, name: str):
+        """Returns a model that is already loaded; for code running on worker threads."""
+        spec = self._specs[name]
+        if spec.state != READY:
+            raise ModelNotReady(name, spec.state, self.retry_after, spec.error)
+        return spec.value
+
+    async def get(self, name: str, wait: bool = None):
+        """
+        Returns a loaded model. Lazy models are loaded on first use and waited for;
+        models loading at startup raise ModelNotReady until they are ready
+        (pass wait=True to wait for them instead).
+        """
+        spec = self._specs[name]
+        if spec.state == READY:
+            return spec.value
+        if spec.state == FAILED:
+            raise ModelNotReady(name, spec.state, self.retry_after, spec.error)
+
+        task = self._ensure_loading(name)
+        if wait is None:
+            wait = spec.lazy
+        if not wait:
+            raise ModelNotReady(name, spec.state, self.retry_after)
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            raise ModelNotReady(name, FAILED, self.retry_after, spec.error)
+
+    async def require(self, *names: str) -> list:
+        return [await self.get(name) for name in names]
+
+    def status(self) -> dict:
+        return {
+            name: {
+                "state": spec.state,
+                "lazy": spec.lazy,
+                "load_seconds": spec.load_seconds,
+                "error": spec.error,
+            }
+            for name, spec in self._specs.items()
+        }
+
+    def shutdown(self):
+        for spec in self._specs.values():
+            if spec.task is not None and not spec.task.done():
+                spec.task.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,23 +1,39 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, status
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Depends, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-import shutil
 import os
-import tempfile
-from src.generator import QuestionGenerator, chunk_text
-from src.mcq_engine import MCQEngine
-from src.summarizer import Summarizer
-from src.tutor import SocraticTutor
-from difflib import SequenceMatcher
+from src.generator import TextChunker
+from src.ingestion import SpooledUpload, aiter_document_text, create_page_pool, spool_upload
+from src.dedup import MinHashDeduplicator
+from src.summarizer import FAILED_SUMMARY
+from src.tutor import FAILED_HINT
+from src.cpu_inference import configure_interop_threads
+from src.transcripts import TranscriptService
+import asyncio
 import random
-import io
-import pypdf
-from youtube_transcript_api import YouTubeTranscriptApi
+import json
 import models
-from database import db
-from auth import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from datetime import timedelta
+from database import db, ensure_indexes
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from inference import InferenceExecutor, InferenceQueueFull
+from registry import ModelNotReady, ModelRegistry
+from model_loaders import lazy_models_from_env, register_inference_pools, register_local_models
+from model_server import ModelClient, authkey_from_env, register_remote_models
+from jobs import JobManager
+from batcher import MicroBatcher
+from hints import HintPrecomputer
+from chunk_store import ChunkStore
+from analytics import AttemptRecorder, StatsAccumulator
+from bson.errors import InvalidId
+from bulk_writer import BulkWriter
+from knowledge_map import KnowledgeMap
+from cache import cache_from_env, content_hash, make_key
+from auth import get_password_hash_async, verify_password_async, create_access_token, get_current_user, hash_pool, ACCESS_TOKEN_EXPIRE_MINUTES
+from datetime import datetime, timedelta
 import logging
 
 # Configure logging
@@ -26,6 +42,14 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Number of answer/context prompts sent through the question model per forward pass
+GENERATION_BATCH_SIZE = int(os.getenv("GENERATION_BATCH_SIZE", "8"))
+
+# Chunk size in model tokens (leaves room for the "answer: ... context:" prompt within T5's 512),
+# and how many tokens of trailing sentences each chunk repeats from the previous one
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+
 # Setup CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,26 +57,141 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Blocking model calls run on per-model thread pools with bounded queues
+configure_interop_threads()
+inference = InferenceExecutor()
+register_inference_pools(inference)
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full_handler(request, exc: InferenceQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"The {exc.model_name} model is busy. Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Background generation jobs. State and results live in MongoDB, so with several uvicorn
+# workers any of them can answer polls and event streams for a job another one is running.
+jobs = JobManager(db.jobs, db.job_events)
+
+# Topic/subtopic counters behind the knowledge map
+knowledge_map = KnowledgeMap(db.knowledge_map_counts)
+
+# Source chunks are stored once in 'chunks'; questions and exams reference them by chunk_id
+chunk_store = ChunkStore(db.chunks)
+
+async def on_questions_written(questions: list):
+    await knowledge_map.record(questions)
+    if hint_precomputer is not None:
+        hint_precomputer.schedule(questions)
+
+# Generated questions are written to MongoDB in batches; each written batch updates the map
+# counters and, with PRECOMPUTE_HINTS=1, queues tutor hints for its MCQs
+question_writer = BulkWriter(db.questions, on_flush=on_questions_written)
+
+# Exam attempts are graded on submission; attempt documents are written in batches and the
+# analytics counters are coalesced in memory and flushed with $inc every second
+stats_accumulator = StatsAccumulator(db)
+attempt_writer = BulkWriter(db.attempts)
+attempt_recorder = AttemptRecorder(db, attempt_writer, stats_accumulator)
+
+# PDF pages are extracted in parallel on worker processes
+page_pool = create_page_pool(int(os.getenv("PDF_WORKERS", os.cpu_count() or 1)))
+
+# YouTube transcripts are fetched off the event loop, cached on disk per video and shared
+# between concurrent requests (e.g. summarize then generate on the same lecture)
+transcripts = TranscriptService(
+    cache_dir=os.getenv("TRANSCRIPT_CACHE_DIR"),
+    ttl=float(os.getenv("TRANSCRIPT_CACHE_TTL_HOURS", "168")) * 3600,
 )
 
-# Global models (loaded on startup)
-generator = None
-mcq_engine = None
-summarizer_model = None
-tutor_model = None
+# Content-addressed cache for extracted text, summaries and question sets
+cache = cache_from_env(db.generation_cache)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await jobs.shutdown()
+    for writer in (question_writer, attempt_writer):
+        try:
+            await writer.flush()
+        except Exception as e:
+            print(f"Unwritten documents for {writer.collection.name} are lost at shutdown: {e}")
+    await stats_accumulator.flush()
+    if hint_precomputer is not None:
+        await hint_precomputer.shutdown()
+    inference.shutdown()
+    hash_pool.shutdown(wait=False, cancel_futures=True)
+    transcripts.shutdown()
+    model_registry.shutdown()
+    if model_client:
+        model_client.close()
+    page_pool.shutdown(wait=False, cancel_futures=True)
+
+# Models load concurrently in the background after startup; endpoints that need a model
+# still loading get a 503 with Retry-After. Models listed in LAZY_MODELS load on first use.
+# With MODEL_SERVER set, models live in a shared model server process (see model_server.py)
+# and this worker only holds proxies, so several uvicorn workers share one copy of the weights.
+MODEL_SERVER = os.getenv("MODEL_SERVER")
+
+model_registry = ModelRegistry(max_workers=int(os.getenv("MODEL_LOAD_WORKERS", "4")))
+model_client = None
+if MODEL_SERVER:
+    model_client = ModelClient(MODEL_SERVER, authkey_from_env())
+    register_remote_models(model_registry, model_client, lazy_models_from_env())
+else:
+    register_local_models(model_registry, lazy_models_from_env())
+
+# Everything question generation needs
+GENERATION_MODELS = ("generator", "mcq_engine", "topic_classifier")
+
+@app.exception_handler(ModelNotReady)
+async def model_not_ready_handler(request, exc: ModelNotReady):
+    if exc.state == "failed":
+        detail = f"The {exc.model_name} model failed to load: {exc.error}"
+    else:
+        detail = f"The {exc.model_name} model is not loaded yet. Please retry shortly."
+    return JSONResponse(
+        status_code=503,
+        content={"detail": detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 @app.on_event("startup")
 async def startup_event():
-    global generator, mcq_engine, summarizer_model, tutor_model
-    print("Loading models...")
-    try:
-        generator = QuestionGenerator()
-        mcq_engine = MCQEngine()
-        summarizer_model = Summarizer()
-        tutor_model = SocraticTutor()
-        print("Models loaded successfully.")
-    except Exception as e:
-        print(f"Error loading models: {e}")
+    await ensure_indexes()
+    await knowledge_map.ensure_backfilled(db.questions)
+    # Returns immediately; auth and CRUD endpoints serve traffic while models load
+    model_registry.start()
+    # Older questions and exams embedded their chunk text; move it to the chunk store in the background
+    normalize_task = asyncio.create_task(normalize_contexts())
+    normalize_task.add_done_callback(report_normalized)
+    # Band keys stored under an older LSH banding would never match new questions
+    rebuild_task = asyncio.create_task(rebuild_dedup_bands())
+    rebuild_task.add_done_callback(report_rebuilt_bands)
+
+async def normalize_contexts() -> tuple:
+    return await chunk_store.normalize(db.questions), await chunk_store.normalize_exams(db.exams)
+
+def report_normalized(task):
+    if task.cancelled():
+        return
+    if task.exception():
+        print(f"Moving question contexts to the chunk store failed: {task.exception()}")
+        return
+    questions, exams = task.result()
+    if questions or exams:
+        print(f"Moved the context of {questions} questions and {exams} exams to the chunk store.")
+
+def report_rebuilt_bands(task):
+    if task.cancelled():
+        return
+    if task.exception():
+        print(f"Rebuilding question dedup bands failed: {task.exception()}")
+    elif task.result():
+        print(f"Rebuilt the dedup bands of {task.result()} questions.")
 
 # AUTH ENDPOINTS
 
@@ -67,7 +206,8 @@ async def signup(user: models.UserCreate):
         )
     
     # Hash password and create user
-    hashed_password = get_password_hash(user.password)
+    # Hashing runs on the auth thread pool so the event loop keeps serving other requests
+    hashed_password = await get_password_hash_async(user.password)
     user_in_db = models.UserInDB(
         name=user.name,
         email=user.email,
@@ -75,7 +215,14 @@ async def signup(user: models.UserCreate):
         role=user.role
     )
     
-    result = await db.users.insert_one(user_in_db.dict())
+    try:
+        await db.users.insert_one(user_in_db.dict())
+    except DuplicateKeyError:
+        # Same email signed up concurrently; the unique index rejected the second insert
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered",
+        )
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -100,7 +247,7 @@ async def login(user_data: models.UserLogin):
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    if not verify_password(user_data.password, user["hashed_password"]):
+    if not await verify_password_async(user_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -119,265 +266,501 @@ async def login(user_data: models.UserLogin):
         "user_role": user["role"]
     }
 
+@app.get("/api/users/me")
+async def read_current_user(current_user: dict = Depends(get_current_user)):
+    return current_user
+
 # GENERATION ENDPOINTS
 
-@app.post("/api/generate")
-async def generate_questions(
-    file: Optional[UploadFile] = File(None),
-    youtube_url: Optional[str] = Form(None),
-    num_questions: int = Form(5),
-    mode: str = Form('mcq'),
-):
-    if not generator or not mcq_engine:
-         raise HTTPException(status_code=503, detail="Models are not loaded yet.")
+def build_question_set(chunks: List[str], mode: str, num_questions: int, dedup: Optional[MinHashDeduplicator] = None) -> List[dict]:
+    """
+    Generates question documents for the given chunks. Blocking: call through the inference executor.
+    Near-duplicate questions are dropped across all chunks; pass the same 'dedup' index
+    to successive calls to extend that across a whole document.
+    """
+    generator = model_registry.loaded("generator")
+    mcq_engine = model_registry.loaded("mcq_engine")
+    topic_classifier = model_registry.loaded("topic_classifier")
+    dedup = dedup or MinHashDeduplicator()
+    results = []
 
-    content = ""
-    try:
-        # Handle YouTube URL
-        if youtube_url:
-            try:
-                # Extract video ID from URL (basic extraction)
-                if "v=" in youtube_url:
-                    video_id = youtube_url.split("v=")[1].split("&")[0]
-                elif "youtu.be/" in youtube_url:
-                    video_id = youtube_url.split("youtu.be/")[1].split("?")[0]
-                else:
-                    raise ValueError("Invalid YouTube URL format")
-                
-                api = YouTubeTranscriptApi()
-                transcript_list = api.list(video_id).find_transcript(['en', 'hi', 'gu']).fetch()
-                content = " ".join([t['text'] for t in transcript_list])
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error fetching YouTube transcript: {str(e)}")
-                
-        # Handle File Upload
-        elif file:
-            contents_bytes = await file.read()
-        
-        # Check if file is PDF based on filename or mime type (basic check)
-        if file.filename.lower().endswith('.pdf'):
-            try:
-                # Process PDF
-                pdf_file = io.BytesIO(contents_bytes)
-                reader = pypdf.PdfReader(pdf_file)
-                text_content = []
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_content.append(text)
-                content = "\n".join(text_content)
-            except Exception as e:
-                 raise HTTPException(status_code=400, detail=f"Error parsing PDF: {str(e)}")
-        else:
-            # Assume text/plain
-            content = contents_bytes.decode("utf-8")
+    # Topics are assigned once per chunk (in one batch) and shared by all of its questions
+    chunk_topics = dict(zip(chunks, topic_classifier.classify_batch(chunks)))
 
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+    if mode == 'qa':
+        # Answer/context pairs from every chunk go through the model together
+        pairs = []
+        for chunk in chunks:
+            answers = mcq_engine.get_candidate_answers(chunk, num_candidates=num_questions)
+            pairs.extend((ans, chunk) for ans in answers)
 
-    if not content.strip():
-        raise HTTPException(status_code=400, detail="File is empty or no text could be extracted.")
+        questions = generator.generate_for_chunks(pairs, batch_size=GENERATION_BATCH_SIZE)
+        for (ans, chunk), question in zip(pairs, questions):
+            signature = dedup.signature(question)
+            if dedup.find_duplicate(signature) is not None:
+                continue
+            dedup.add(signature)
 
-    chunks = chunk_text(content)
-    
-    # Limit processing for demo performance
-    processed_chunks = chunks[:3] 
-    
-    results = []
-    
-    # Generate questions
-    for i, chunk in enumerate(processed_chunks):
-        if mode == 'qa':
-            answers = mcq_engine.get_candidate_answers(chunk, num_candidates=num_questions)
-            for ans in answers:
-                question = generator.generate_for_answer(ans, chunk)
-                q_data = {
-                    "type": "qa", 
-                    "text": question, 
-                    "answer": ans,
-                    "context": chunk,
-                    "topic": random.choice(["Math", "Science", "Computer Science"]),
-                    "subtopic": random.choice(["Algebra", "Physics", "Web Dev", "Data Structures", "Biology", "Calculus"])
-                }
-                results.append(q_data)
-                # Save to MongoDB
-                await db.questions.insert_one(q_data)
-                
-        elif mode == 'mcq':
+            results.append({
+                "type": "qa", 
+                "text": question, 
+                "answer": ans,
+                "context": chunk,
+                "chunk_id": content_hash(chunk),
+                "minhash": signature,
+                "dedup_bands": dedup.band_keys(signature),
+                "topic": chunk_topics[chunk][0],
+                "subtopic": chunk_topics[chunk][1]
+            })
+
+    elif mode == 'mcq':
+        for chunk in chunks:
             answers = mcq_engine.get_candidate_answers(chunk, num_candidates=num_questions * 3)
-            seen_questions = []
-            
-            for ans in answers:
-                if len(seen_questions) >= num_questions:
+            accepted = []
+
+            # Generate a batch at a time and stop once enough unique questions are collected
+            for start in range(0, len(answers), GENERATION_BATCH_SIZE):
+                if len(accepted) >= num_questions:
                     break
-                    
-                question = generator.generate_for_answer(ans, chunk)
-                
-                # Dedup
-                is_duplicate = False
-                for existing_q in seen_questions:
-                     if SequenceMatcher(None, question, existing_q).ratio() > 0.85:
-                         is_duplicate = True
-                         break
-                
-                if is_duplicate:
-                    continue
-
-                seen_questions.append(question)
-                
-                distractors = mcq_engine.get_distractors(ans, chunk)
+
+                batch_answers = answers[start:start + GENERATION_BATCH_SIZE]
+                batch_questions = generator.generate_for_answers(batch_answers, chunk, batch_size=GENERATION_BATCH_SIZE)
+
+                for ans, question in zip(batch_answers, batch_questions):
+                    if len(accepted) >= num_questions:
+                        break
+
+                    # Dedup against every question generated so far for this document
+                    signature = dedup.signature(question)
+                    if dedup.find_duplicate(signature) is not None:
+                        continue
+                    dedup.add(signature)
+
+                    accepted.append((ans, question, signature))
+
+            # Distractors for every accepted answer of the chunk are picked in one pass
+            distractor_sets = mcq_engine.get_distractors_batch([ans for ans, _, _ in accepted], chunk)
+            for (ans, question, signature), distractors in zip(accepted, distractor_sets):
                 options = distractors + [ans]
                 random.shuffle(options)
-                
-                q_data = {
+
+                results.append({
                     "type": "mcq",
                     "text": question,
                     "options": options,
                     "answer": ans,
                     "context": chunk,
-                    "topic": random.choice(["Math", "Science", "Computer Science"]),
-                    "subtopic": random.choice(["Algebra", "Physics", "Web Dev", "Data Structures", "Biology", "Calculus"])
-                }
-                results.append(q_data)
-                
-                # Save to MongoDB
-                await db.questions.insert_one(q_data)
-
-    # Convert ObjectId to string for JSON serialization if needed, or just return results
-    # results already dicts without _id if we defined them before insert_one adds it?
-    # insert_one adds _id to the dict in place.
-    for r in results:
-        if '_id' in r:
-            del r['_id']
+                    "chunk_id": content_hash(chunk),
+                    "minhash": signature,
+                    "dedup_bands": dedup.band_keys(signature),
+                    "topic": chunk_topics[chunk][0],
+                    "subtopic": chunk_topics[chunk][1]
+                })
 
-    return {"results": results}
+    return results
 
-@app.post("/api/summarize")
-async def summarize_text(
-    file: UploadFile = File(None),
-    text: str = Form(None),
-    youtube_url: Optional[str] = Form(None),
-):
-    if not summarizer_model:
-        raise HTTPException(status_code=503, detail="Summarizer model is not loaded yet.")
+async def fetch_youtube_transcript(youtube_url: str) -> str:
+    try:
+        return await transcripts.get(youtube_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error fetching YouTube transcript: {str(e)}")
 
-    content = ""
-    
+async def open_content(
+    file: Optional[UploadFile] = None,
+    youtube_url: Optional[str] = None,
+    text: Optional[str] = None,
+):
+    """
+    Resolves whichever input was provided: a YouTube URL, an uploaded PDF/text file, or raw text.
+    Returns (upload, text): uploads are spooled to a temp file (call upload.cleanup() when done)
+    and read lazily; the other inputs come back as text.
+    """
     # Handle YouTube URL
     if youtube_url:
-        try:
-            if "v=" in youtube_url:
-                video_id = youtube_url.split("v=")[1].split("&")[0]
-            elif "youtu.be/" in youtube_url:
-                video_id = youtube_url.split("youtu.be/")[1].split("?")[0]
-            else:
-                raise ValueError("Invalid YouTube URL format")
-            
-            # Create instance and use list/fetch pattern
-            api = YouTubeTranscriptApi()
-            transcript_list = api.list(video_id).find_transcript(['en', 'hi', 'gu']).fetch()
-            content = " ".join([t['text'] for t in transcript_list])
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Error fetching YouTube transcript: {str(e)}")
-            
+        return None, await fetch_youtube_transcript(youtube_url)
+
     # Handle File Upload
-    elif file:
+    if file:
         try:
-            contents_bytes = await file.read()
-            if file.filename.lower().endswith('.pdf'):
-                try:
-                    pdf_file = io.BytesIO(contents_bytes)
-                    reader = pypdf.PdfReader(pdf_file)
-                    text_content = []
-                    for page in reader.pages:
-                        extracted = page.extract_text()
-                        if extracted:
-                            text_content.append(extracted)
-                    content = "\n".join(text_content)
-                except Exception as e:
-                    raise HTTPException(status_code=400, detail=f"Error parsing PDF: {str(e)}")
-            else:
-                content = contents_bytes.decode("utf-8")
+            return await spool_upload(file), None
         except Exception as e:
-            if isinstance(e, HTTPException): raise e
             raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
-            
+
     # Handle direct text input
-    elif text:
-        content = text
+    if text:
+        return None, text
+
+    raise HTTPException(status_code=400, detail="No content provided (file, text, or youtube_url required).")
+
+async def iter_upload_text(upload: SpooledUpload, decode_errors: str = "strict"):
+    """
+    Yields the upload's text piece by piece (page by page for PDFs) as it is extracted.
+    Fully extracted PDF text is cached by upload hash, so re-uploads skip extraction.
+    """
+    text_key = make_key("text", upload.sha256)
+    if upload.is_pdf:
+        cached_text = await cache.get(text_key)
+        if cached_text is not None:
+            yield cached_text
+            return
+
+    pieces = []
+    try:
+        async for piece in aiter_document_text(upload, page_pool, decode_errors):
+            pieces.append(piece)
+            yield piece
+    except Exception as e:
+        if upload.is_pdf:
+            raise HTTPException(status_code=400, detail=f"Error parsing PDF: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
+
+    if upload.is_pdf:
+        await cache.set(text_key, "".join(pieces))
+
+async def iter_content_chunks(upload: Optional[SpooledUpload], text: Optional[str], decode_errors: str = "strict", tokenizer=None):
+    """
+    Chunks the content while it is still being extracted, so generation can start on the first pages.
+    Pass the consuming model's chunk_tokenizer so chunk sizes are exact (not the tokenizer its
+    inference threads use: fast tokenizers aren't thread-safe).
+    """
+    chunker = TextChunker(CHUNK_MAX_TOKENS, tokenizer=tokenizer, overlap=CHUNK_OVERLAP_TOKENS)
+    # Sentence splitting and token counting are CPU-bound (a cached PDF arrives as one piece),
+    # so they run on a worker thread instead of the event loop
+    loop = asyncio.get_running_loop()
+    if upload:
+        async for piece in iter_upload_text(upload, decode_errors):
+            for chunk in await loop.run_in_executor(None, chunker.feed, piece):
+                yield chunk
     else:
-        raise HTTPException(status_code=400, detail="No content provided (file, text, or youtube_url required).")
+        for chunk in await loop.run_in_executor(None, chunker.feed, text or ""):
+            yield chunk
+    for chunk in await loop.run_in_executor(None, chunker.flush):
+        yield chunk
+
+async def read_chunks(upload: Optional[SpooledUpload], text: Optional[str], limit: Optional[int] = None, decode_errors: str = "strict", tokenizer=None) -> List[str]:
+    """Collects up to 'limit' chunks; extraction stops as soon as enough chunks are available."""
+    chunks = []
+    stream = iter_content_chunks(upload, text, decode_errors, tokenizer=tokenizer)
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            if limit is not None and len(chunks) >= limit:
+                break
+    finally:
+        await stream.aclose()
+    return chunks
+
+async def read_content(
+    file: Optional[UploadFile] = None,
+    youtube_url: Optional[str] = None,
+    text: Optional[str] = None,
+    decode_errors: str = "strict",
+) -> str:
+    """Returns the full text of whichever input was provided."""
+    upload, content = await open_content(file, youtube_url, text)
+    if not upload:
+        return content
+    try:
+        return "".join([piece async for piece in iter_upload_text(upload, decode_errors)])
+    finally:
+        upload.cleanup()
+
+async def generate_cached_questions(chunks: List[str], mode: str, num_questions: int, run=None,
+                                    dedup: Optional[MinHashDeduplicator] = None,
+                                    pending_cache: Optional[list] = None) -> List[dict]:
+    """
+    Returns question sets for the chunks, generating (and saving) only the chunks not already cached.
+    Sets are cached per chunk, so the same chunk is reused across endpoints, jobs and re-uploads.
+    A set is only cached once its questions are stored, since it hands out their ids. With
+    'pending_cache', questions are written in the background and the new sets' (key, set)
+    entries are appended to it; pass it to flush_questions() when done.
+    """
+    run = run or inference.run
+    generator = model_registry.loaded("generator")
+    keys = [
+        make_key("questions", content_hash(chunk), model=generator.model_name, int8=generator.quantized, mode=mode, num_questions=num_questions)
+        for chunk in chunks
+    ]
+    cached_sets = [await cache.get(key) for key in keys]
+
+    missing = [chunk for chunk, cached in zip(chunks, cached_sets) if cached is None]
+    if missing:
+        fresh = await run("generator", build_question_set, missing, mode, num_questions, dedup)
+        await save_questions_to_db(fresh, flush=pending_cache is None)
+
+        by_chunk = {}
+        for q_data in fresh:
+            by_chunk.setdefault(q_data["chunk_id"], []).append(q_data)
+        for i, (chunk, key) in enumerate(zip(chunks, keys)):
+            if cached_sets[i] is None:
+                cached_sets[i] = by_chunk.get(content_hash(chunk), [])
+                if pending_cache is None:
+                    await cache.set(key, cached_sets[i])
+                else:
+                    pending_cache.append((key, cached_sets[i]))
+
+    return [q_data for question_set in cached_sets for q_data in question_set]
+
+async def flush_questions(pending_cache: list):
+    """Writes the queued questions, then caches the question sets that reference them."""
+    await question_writer.flush()
+    for key, question_set in pending_cache:
+        await cache.set(key, question_set)
+    pending_cache.clear()
+
+async def cached_summaries(texts: List[str], max_length: int = 130, min_length: int = 30, run=None) -> List[str]:
+    """
+    Summaries of the texts, summarizing only the ones not already cached (in one batched call).
+    Texts the model failed on come back as None and are not cached, so the next call retries them.
+    """
+    run = run or inference.run
+    summarizer_model = model_registry.loaded("summarizer")
+    keys = [
+        make_key("summary", content_hash(text), model=summarizer_model.model_name, int8=summarizer_model.quantized,
+                 max_length=max_length, min_length=min_length)
+        for text in texts
+    ]
+    summaries = [await cache.get(key) for key in keys]
+
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if missing:
+        fresh = await run("summarizer", summarizer_model.summarize_batch, [texts[i] for i in missing], max_length, min_length)
+        for i, summary in zip(missing, fresh):
+            summaries[i] = summary
+            if summary is not None:
+                await cache.set(keys[i], summary)
+    return summaries
+
+async def summarize_document(text: str, max_length: int = 130, min_length: int = 30, run=None) -> str:
+    """
+    Map-reduce summary covering the whole document: the text is split into pieces that fit the
+    model, each piece is summarized (in batches), and the joined summaries are split and
+    summarized again until they fit in one piece, which gets the final summary.
+    Every level is cached per piece, and leaf/intermediate summaries use fixed lengths,
+    so asking for a different final length only re-runs the last step.
+    """
+    run = run or inference.run
+    summarizer_model = model_registry.loaded("summarizer")
+    level = await run("summarizer", summarizer_model.split, text)
+    if not level:
+        return ""
+    while len(level) > 1:
+        summaries = await cached_summaries(
+            level, summarizer_model.reduce_max_length, summarizer_model.reduce_min_length, run=run
+        )
+        if None in summaries:
+            # Never feed a failure into the next level; the pieces that worked are cached for a retry
+            raise HTTPException(status_code=500, detail=FAILED_SUMMARY)
+        level = await run("summarizer", summarizer_model.split, " ".join(summaries))
+    summary = (await cached_summaries(level, max_length, min_length, run=run))[0]
+    if summary is None:
+        raise HTTPException(status_code=500, detail=FAILED_SUMMARY)
+    return summary
+
+async def find_stored_duplicates(results: List[dict]) -> List[Optional[str]]:
+    """
+    For each result, returns the id of a near-duplicate question already in the bank (or None).
+    Candidates are found through the indexed LSH band keys in one query. The banding is tuned
+    to the similarity threshold, so only a small share of unrelated questions is read.
+    """
+    if not results:
+        return []
+
+    bands = sorted({key for r in results for key in r["dedup_bands"]})
+    types = sorted({r["type"] for r in results})
+    stored = {}
+    stored_ids = {}
+    cursor = db.questions.find(
+        {"type": {"$in": types}, "dedup_bands": {"$in": bands}},
+        {"minhash": 1, "type": 1},
+    )
+    async for doc in cursor:
+        if doc.get("minhash"):
+            position = stored.setdefault(doc["type"], MinHashDeduplicator()).add(doc["minhash"])
+            stored_ids.setdefault(doc["type"], {})[position] = str(doc["_id"])
+
+    duplicates = []
+    for r in results:
+        position = stored[r["type"]].find_duplicate(r["minhash"]) if r["type"] in stored else None
+        duplicates.append(stored_ids[r["type"]][position] if position is not None else None)
+    return duplicates
+
+async def rebuild_dedup_bands(batch_size: int = 500) -> int:
+    """
+    Recomputes the band keys of stored questions indexed under another banding scheme
+    (signatures don't change). Returns the number of questions updated.
+    """
+    dedup = MinHashDeduplicator()
+    query = {"minhash.0": {"$exists": True}, "dedup_bands.0": {"$not": {"$regex": f"^{dedup.scheme}:"}}}
+    updated = 0
+    while True:
+        docs = await db.questions.find(query, {"minhash": 1}).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            return updated
+        await db.questions.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": {"dedup_bands": dedup.band_keys(doc["minhash"])}}) for doc in docs],
+            ordered=False,
+        )
+        updated += len(docs)
+
+async def save_questions_to_db(results: List[dict], flush: bool = True):
+    """
+    Queues new questions on the bulk writer and sets each result's 'id'. Questions already
+    in the bank are not stored again; they get the id of the stored copy instead.
+    With flush=False the write happens in the background (call question_writer.flush() later).
+    """
+    duplicate_ids = await find_stored_duplicates(results)
+
+    new_results = []
+    new_docs = []
+    for r, duplicate_id in zip(results, duplicate_ids):
+        if duplicate_id:
+            r["id"] = duplicate_id
+        else:
+            new_results.append(r)
+            # The writer keeps its own copy, since the response version is trimmed below
+            new_docs.append(dict(r))
+
+    # Each source chunk is stored once (before the questions that reference it)
+    await chunk_store.put_many([doc.pop("context") for doc in new_docs if "context" in doc])
+
+    for r, inserted_id in zip(new_results, question_writer.add(new_docs)):
+        r["id"] = str(inserted_id)
+
+    # Dedup fields are internal and the chunk text is available by chunk_id; keep them out of the API response
+    for r in results:
+        r.pop("minhash", None)
+        r.pop("dedup_bands", None)
+        r.pop("context", None)
+
+    if flush:
+        await question_writer.flush()
+
+@app.post("/api/generate")
+async def generate_questions(
+    file: Optional[UploadFile] = File(None),
+    youtube_url: Optional[str] = Form(None),
+    num_questions: int = Form(5),
+    mode: str = Form('mcq'),
+):
+    generator, _, _ = await model_registry.require(*GENERATION_MODELS)
+
+    upload, content = await open_content(file, youtube_url)
+    try:
+        # Limit processing for demo performance; use /api/generate/jobs for whole documents
+        processed_chunks = await read_chunks(upload, content, limit=3, tokenizer=generator.chunk_tokenizer)
+    finally:
+        if upload:
+            upload.cleanup()
+
+    if not processed_chunks:
+        raise HTTPException(status_code=400, detail="File is empty or no text could be extracted.")
+
+    # Generation runs on the generator's inference threads so the event loop stays free
+    results = await generate_cached_questions(processed_chunks, mode, num_questions)
+
+    return {"results": results}
+
+@app.post("/api/generate/jobs", status_code=202)
+async def submit_generation_job(
+    file: Optional[UploadFile] = File(None),
+    youtube_url: Optional[str] = Form(None),
+    num_questions: int = Form(5),
+    mode: str = Form('mcq'),
+):
+    """
+    Starts question generation over every chunk of the document and returns a job id right away.
+    Results arrive per chunk through GET /api/jobs/{job_id} or its /events stream.
+    """
+    generator, _, _ = await model_registry.require(*GENERATION_MODELS)
+
+    upload, content = await open_content(file, youtube_url)
 
+    async def worker(job):
+        # One dedup index for the whole document, so duplicates across chunks are dropped
+        dedup = MinHashDeduplicator()
+        pending_cache = []
+        # Chunks are generated while later pages are still being extracted
+        try:
+            count = 0
+            async for chunk in iter_content_chunks(upload, content, tokenizer=generator.chunk_tokenizer):
+                # Writes are batched in the background and flushed (then cached) when the job ends
+                results = await generate_cached_questions([chunk], mode, num_questions, run=inference.run_queued,
+                                                          dedup=dedup, pending_cache=pending_cache)
+                await job.publish(results, count)
+                count += 1
+        finally:
+            await flush_questions(pending_cache)
+            if upload:
+                upload.cleanup()
+
+        if not count:
+            raise ValueError("File is empty or no text could be extracted.")
+        await job.set_total(count)
+
+    job = await jobs.submit("generate", worker)
+    return {"job_id": job.id, "status": job.status, "total_chunks": job.total}
+
+@app.post("/api/summarize")
+async def summarize_text(
+    file: UploadFile = File(None),
+    text: str = Form(None),
+    youtube_url: Optional[str] = Form(None),
+    max_length: int = Form(130),
+    min_length: int = Form(30),
+):
+    await model_registry.get("summarizer")
+
+    content = await read_content(file, youtube_url, text)
     if not content.strip():
         raise HTTPException(status_code=400, detail="Content is empty.")
 
-    summary = summarizer_model.summarize(content)
+    # Covers the whole document, not just its first page or two. If the summarizer gets busy
+    # part-way through, the 503 is cheap to retry: finished pieces are already cached.
+    summary = await summarize_document(content, max_length=max_length, min_length=min_length)
     return {"summary": summary}
 
+# JOB ENDPOINTS
+
+async def get_job_or_404(job_id: str) -> dict:
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, since: int = 0):
+    """Polls a job. 'since' skips results the client already has (use the previous response's 'next')."""
+    return await jobs.to_dict(await get_job_or_404(job_id), since=since)
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    after_event: int = -1,
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Server-Sent Events stream of a job: one 'chunk' event per processed chunk, then 'done' or 'error'.
+    Every event carries an 'id:' line; reconnecting clients resume after it through the standard
+    Last-Event-ID header, or 'after_event'. These are event ids, not the result indexes of ?since= polls.
+    """
+    await get_job_or_404(job_id)
+    if last_event_id is not None:
+        after_event = last_event_id
+
+    async def event_source():
+        async for seq, event in jobs.stream(job_id, after_event=after_event):
+            yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
 # KNOWLEDGE MAP ENDPOINTS
 
 @app.get("/api/knowledge-map")
 async def get_knowledge_map():
-    # In a real app, this would aggregate real student data or question banks.
-    # Here we aggregate by topic and subtopic from the generated questions collection.
-    
-    questions = await db.questions.find({}).to_list(length=1000)
-    
-    nodes_dict = {}
-    links = []
-    
-    # Predefined groups for coloring
-    topic_groups = {"Math": 1, "Science": 2, "Computer Science": 3}
-    
-    for q in questions:
-        topic = q.get("topic")
-        subtopic = q.get("subtopic")
-        
-        if not topic or not subtopic:
-            continue
-            
-        # Add Topic Node
-        if topic not in nodes_dict:
-            nodes_dict[topic] = {
-                "id": topic,
-                "group": topic_groups.get(topic, 4),
-                "val": 10, # Base size
-                "description": f"Core area: {topic}"
-            }
-        else:
-            nodes_dict[topic]["val"] += 2 # Grow topic node with more questions
-            
-        # Add Subtopic Node
-        if subtopic not in nodes_dict:
-            nodes_dict[subtopic] = {
-                "id": subtopic,
-                "group": topic_groups.get(topic, 4),
-                "val": 5,
-                "description": f"Subtopic of {topic}"
-            }
-        else:
-            nodes_dict[subtopic]["val"] += 1
-            
-        # Create link between topic and subtopic
-        link = {"source": topic, "target": subtopic}
-        if link not in links:
-            links.append(link)
-            
-    # Convert nodes dict to list
-    nodes = list(nodes_dict.values())
-    
-    # If DB is empty, return some default placeholder data so the map still renders early
-    if not nodes:
-        return {
-            "nodes": [
-                {"id": "Start Learning", "group": 1, "val": 20, "description": "Generate some exams to populate your map!"}
-            ],
-            "links": []
-        }
-        
-    return {"nodes": nodes, "links": links}
+    # Aggregated by topic and subtopic over the whole question bank. The counters are
+    # kept up to date as questions are inserted, so this never scans the questions collection.
+    return await knowledge_map.get_map()
 
 # TUTOR ENDPOINTS
 
@@ -386,36 +769,135 @@ class HintRequest(BaseModel):
     wrong_answer: str
     correct_answer: str
     context: Optional[str] = ""
+    question_id: Optional[str] = None
+
+async def generate_hint_batch(items: List[tuple]) -> List[Optional[str]]:
+    """Generates hints for (cache key, request) items and caches each one once, however many callers share it."""
+    tutor_model = model_registry.loaded("tutor")
+    hints = await inference.run("tutor", tutor_model.generate_hints, [request for _, request in items])
+    for (key, _), hint in zip(items, hints):
+        # None means generation failed; the caller falls back without caching
+        if hint is not None:
+            await cache.set(key, hint)
+    return hints
+
+# Hint requests arriving within a few milliseconds of each other share one batched generate call
+hint_batcher = MicroBatcher(
+    generate_hint_batch,
+    max_batch=int(os.getenv("HINT_BATCH_SIZE", "16")),
+    max_wait=float(os.getenv("HINT_BATCH_WAIT_MS", "10")) / 1000,
+)
+
+async def precompute_hint_batch(requests: List[tuple]) -> List[str]:
+    # Background work: waits for the (lazy) tutor model and for room in its queue
+    tutor_model = await model_registry.get("tutor", wait=True)
+    return await inference.run_queued("tutor", tutor_model.generate_hints, requests)
+
+hint_precomputer = None
+if os.getenv("PRECOMPUTE_HINTS", "0") == "1":
+    hint_precomputer = HintPrecomputer(
+        db.questions,
+        precompute_hint_batch,
+        chunk_store=chunk_store,
+        batch_size=int(os.getenv("HINT_BATCH_SIZE", "16")),
+    )
 
 @app.post("/api/tutor/hint")
 async def get_tutor_hint(request: HintRequest):
-    if not tutor_model:
-        raise HTTPException(status_code=503, detail="Tutor model is not loaded yet.")
-    
-    hint = tutor_model.generate_hint(
-        request.question_text, 
-        request.wrong_answer, 
-        request.correct_answer, 
-        request.context
-    )
-    
+    context = request.context
+    if request.question_id:
+        try:
+            question = await db.questions.find_one({"_id": ObjectId(request.question_id)}, {"hints": 1, "chunk_id": 1})
+        except Exception:
+            question = None
+        if question:
+            # Hints precomputed when the question was generated need no model call
+            for stored in question.get("hints", []):
+                if stored["answer"] == request.wrong_answer:
+                    return {"hint": stored["hint"]}
+            # Clients don't need to send the source text; it is resolved from the chunk store
+            if not context and question.get("chunk_id"):
+                context = await chunk_store.get(question["chunk_id"]) or ""
+
+    # Loaded on first use unless removed from LAZY_MODELS
+    tutor_model = await model_registry.get("tutor")
+
+    # During a quiz many students pick the same wrong answer: identical requests are
+    # served from the cache, or share the generation already in progress
+    digest = content_hash("\x1f".join([request.question_text, request.wrong_answer, request.correct_answer]))
+    key = make_key("hint", digest, model=tutor_model.model_name, int8=tutor_model.quantized)
+    hint = await cache.get(key)
+    if hint is None:
+        hint = await hint_batcher.submit(
+            key,
+            (key, (request.question_text, request.wrong_answer, request.correct_answer, context)),
+        )
+    if hint is None:
+        hint = FAILED_HINT
+
     return {"hint": hint}
 
+# List endpoints page newest-first with an opaque cursor (the last _id of the previous page),
+# returned in the X-Next-Cursor header so the response body stays a plain list.
+MAX_PAGE_SIZE = 200
+
+def parse_object_id(value: str, detail: str) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except Exception:
+        raise HTTPException(status_code=400, detail=detail)
+
+def set_next_cursor(response: Response, docs: list, limit: int):
+    if len(docs) == limit:
+        response.headers["X-Next-Cursor"] = docs[-1]["id"]
+
 @app.get("/api/questions")
-async def get_questions(type: Optional[str] = None):
+async def get_questions(
+    response: Response,
+    type: Optional[str] = None,
+    topic: Optional[str] = None,
+    subtopic: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_context: bool = False,
+):
     query = {}
     if type:
         query["type"] = type
-    
-    # Sort by descending _id to get newest first
-    questions = await db.questions.find(query).sort("_id", -1).to_list(length=50)
+    if topic:
+        query["topic"] = topic
+    if subtopic:
+        query["subtopic"] = subtopic
+    if cursor:
+        query["_id"] = {"$lt": parse_object_id(cursor, "Invalid cursor")}
+
+    # Questions written before the chunk store may still embed their context
+    projection = {"minhash": 0, "dedup_bands": 0, "hints": 0, "context": 0}
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # Sort by descending _id to get newest first (served by the type/_id index)
+    questions = await db.questions.find(query, projection).sort("_id", -1).limit(limit).to_list(length=limit)
     for q in questions:
         q['id'] = str(q.pop('_id'))
+    if include_context:
+        # The chunk text is the bulk of each question; only resolve it when asked for
+        texts = await chunk_store.get_many([q.get("chunk_id") for q in questions])
+        for q in questions:
+            q["context"] = texts.get(q.get("chunk_id"), "")
+    set_next_cursor(response, questions, limit)
     return questions
 
 @app.post("/api/exams")
 async def create_exam(exam_data: models.ExamCreate):
     exam_dict = exam_data.dict()
+    # Questions reference their source chunk instead of carrying a copy of it
+    questions = exam_dict["questions"]
+    with_context = [q for q in questions if q.get("context")]
+    chunk_ids = await chunk_store.put_many([q["context"] for q in with_context])
+    for q, chunk_id in zip(with_context, chunk_ids):
+        q["chunk_id"] = chunk_id
+    for q in questions:
+        q.pop("context", None)
     result = await db.exams.insert_one(exam_dict)
     # Remove MongoDB's internal _id if it was added to the dict
     if "_id" in exam_dict:
@@ -423,82 +905,287 @@ async def create_exam(exam_data: models.ExamCreate):
     exam_dict['id'] = str(result.inserted_id)
     return exam_dict
 
+# Fields an assembled exam keeps of each question (no source text or internal dedup data)
+EXAM_QUESTION_FIELDS = {"text": 1, "type": 1, "options": 1, "answer": 1, "topic": 1, "subtopic": 1, "chunk_id": 1}
+
+@app.post("/api/exams/assemble")
+async def assemble_exam(request: models.ExamAssemble):
+    """
+    Builds an exam from the question bank: each section draws 'count' random questions
+    matching its topic/subtopic/type with an indexed $match + $sample on the server,
+    never repeating a question across sections. Sections the bank can't fill are reported
+    in 'shortfalls'.
+    """
+    if not request.sections or any(not 1 <= section.count <= MAX_PAGE_SIZE for section in request.sections):
+        raise HTTPException(status_code=400, detail=f"Each section needs a count between 1 and {MAX_PAGE_SIZE}.")
+
+    now = datetime.utcnow()
+    chosen_ids = []
+    questions = []
+    shortfalls = []
+    for section in request.sections:
+        match = {"_id": {"$nin": chosen_ids}}
+        for field in ("topic", "subtopic", "type"):
+            value = getattr(section, field)
+            if value:
+                match[field] = value
+        if request.exclude_used_within_days > 0:
+            match["last_used_at"] = {"$not": {"$gte": now - timedelta(days=request.exclude_used_within_days)}}
+
+        picked = await db.questions.aggregate([
+            {"$match": match},
+            {"$sample": {"size": section.count}},
+            {"$project": EXAM_QUESTION_FIELDS},
+        ]).to_list(length=section.count)
+
+        for q in picked:
+            chosen_ids.append(q["_id"])
+            q["id"] = str(q.pop("_id"))
+        questions.extend(picked)
+        if len(picked) < section.count:
+            shortfalls.append({**section.dict(), "missing": section.count - len(picked)})
+
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions in the bank match these sections.")
+
+    exam_dict = {
+        "title": request.title,
+        "description": request.description,
+        "questions": questions,
+        "question_ids": chosen_ids,
+        "duration": request.duration or len(questions) * 2, # 2 mins per question
+        "created_by": request.created_by,
+        "created_at": now,
+    }
+    result = await db.exams.insert_one(exam_dict)
+    await db.questions.update_many({"_id": {"$in": chosen_ids}}, {"$set": {"last_used_at": now}})
+
+    exam_dict.pop("_id", None)
+    exam_dict.pop("question_ids")
+    exam_dict["id"] = str(result.inserted_id)
+    return {"exam": exam_dict, "shortfalls": shortfalls}
+
 @app.get("/api/exams")
-async def get_exams():
-    exams = await db.exams.find({}).sort("_id", -1).to_list(length=100)
+async def get_exams(response: Response, limit: int = 50, cursor: Optional[str] = None):
+    """Exam summaries (no embedded questions); fetch /api/exams/{exam_id} for the full exam."""
+    match = {}
+    if cursor:
+        match["_id"] = {"$lt": parse_object_id(cursor, "Invalid cursor")}
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    exams = await db.exams.aggregate([
+        {"$match": match},
+        {"$sort": {"_id": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "title": 1,
+            "description": 1,
+            "duration": 1,
+            "created_by": 1,
+            "created_at": 1,
+            "question_count": {"$size": {"$ifNull": ["$questions", []]}},
+        }},
+    ]).to_list(length=limit)
     for e in exams:
         e['id'] = str(e.pop('_id'))
+    set_next_cursor(response, exams, limit)
     return exams
 
-from bson import ObjectId
 @app.get("/api/exams/{exam_id}")
 async def get_exam(exam_id: str):
-    try:
-        exam = await db.exams.find_one({"_id": ObjectId(exam_id)})
-        if exam:
-            exam['id'] = str(exam.pop('_id'))
-            return exam
+    exam = await db.exams.find_one({"_id": parse_object_id(exam_id, "Invalid exam ID format")}, {"question_ids": 0})
+    if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="Invalid exam ID format")
+    exam['id'] = str(exam.pop('_id'))
+    return exam
+
+TITLE_SLIDE = {
+    "title": "Presentation Overview",
+    "content": ["Generated by AI from uploaded material", "Covers key concepts and summaries"]
+}
+
+def build_slide(index: int, summary: Optional[str]) -> dict:
+    summary = summary or FAILED_SUMMARY
+    points = [p.strip() + "." for p in summary.split('.') if len(p.strip()) > 10]
+    if not points:
+        points = [summary]
+
+    return {
+        "title": f"Key Concepts - Section {index+1}",
+        "content": points[:3] # Keep 3 bullets max per slide
+    }
 
 @app.post("/api/slides/generate")
 async def generate_slides(
     file: Optional[UploadFile] = File(None),
-    text: Optional[str] = Form(None)
+    text: Optional[str] = Form(None),
+    full_document: bool = Form(False),
 ):
-    if not summarizer_model:
-        raise HTTPException(status_code=503, detail="Summarizer model is not loaded yet.")
+    summarizer_model = await model_registry.get("summarizer")
 
-    content = ""
-    if file:
-        contents_bytes = await file.read()
-        if file.filename.lower().endswith('.pdf'):
-            try:
-                pdf_file = io.BytesIO(contents_bytes)
-                reader = pypdf.PdfReader(pdf_file)
-                text_content = []
-                for page in reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text_content.append(extracted)
-                content = "\n".join(text_content)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error parsing PDF: {str(e)}")
-        else:
-            content = contents_bytes.decode("utf-8", errors="ignore")
-    elif text:
-        content = text
-    else:
-        raise HTTPException(status_code=400, detail="No content provided")
+    upload, content = await open_content(file, text=text)
+    try:
+        # First 4 sections unless full_document is set; /api/slides/jobs streams whole documents
+        limit = None if full_document else 4
+        processed_chunks = await read_chunks(upload, content, limit=limit, decode_errors="ignore", tokenizer=summarizer_model.chunk_tokenizer)
+    finally:
+        if upload:
+            upload.cleanup()
 
-    if not content.strip():
+    if not processed_chunks:
         raise HTTPException(status_code=400, detail="Content is empty.")
-
-    chunks = chunk_text(content)
-    processed_chunks = chunks[:4] # limit for speed
-    
-    slides = []
     
-    # Title slide
-    slides.append({
-        "title": "Presentation Overview",
-        "content": ["Generated by AI from uploaded material", "Covers key concepts and summaries"]
-    })
-    
-    for i, chunk in enumerate(processed_chunks):
-        summary = summarizer_model.summarize(chunk)
-        points = [p.strip() + "." for p in summary.split('.') if len(p.strip()) > 10]
-        if not points:
-            points = [summary]
-            
-        slides.append({
-            "title": f"Key Concepts - Section {i+1}",
-            "content": points[:3] # Keep 3 bullets max per slide
-        })
-        
+    # One batched, length-sorted summarizer call for every section not already cached
+    summaries = await cached_summaries(processed_chunks)
+    slides = [TITLE_SLIDE] + [build_slide(i, summary) for i, summary in enumerate(summaries)]
+
     return {"slides": slides}
 
+@app.post("/api/slides/jobs", status_code=202)
+async def submit_slides_job(
+    file: Optional[UploadFile] = File(None),
+    text: Optional[str] = Form(None)
+):
+    """
+    Starts slide generation for the whole document and returns a job id right away.
+    The title slide is published first, then one slide per chunk.
+    """
+    summarizer_model = await model_registry.get("summarizer")
+
+    upload, content = await open_content(file, text=text)
+
+    async def worker(job):
+        await job.publish([TITLE_SLIDE], -1)
+        try:
+            count = 0
+            pending = []
+
+            async def publish_pending():
+                # Sections are summarized batch_size at a time in one pipeline call
+                nonlocal count
+                summaries = await cached_summaries(pending, run=inference.run_queued)
+                for summary in summaries:
+                    await job.publish([build_slide(count, summary)], count)
+                    count += 1
+                pending.clear()
+
+            async for chunk in iter_content_chunks(upload, content, decode_errors="ignore", tokenizer=summarizer_model.chunk_tokenizer):
+                pending.append(chunk)
+                if len(pending) >= summarizer_model.batch_size:
+                    await publish_pending()
+            if pending:
+                await publish_pending()
+        finally:
+            if upload:
+                upload.cleanup()
+
+        if not count:
+            raise ValueError("Content is empty.")
+        await job.set_total(count + 1)
+
+    job = await jobs.submit("slides", worker)
+    return {"job_id": job.id, "status": job.status, "total_chunks": job.total}
+
+# ATTEMPT & ANALYTICS ENDPOINTS
+
+def is_teacher(user: dict) -> bool:
+    return user.get("role") == "teacher"
+
+async def record_attempts(attempts: List[models.AttemptCreate], current_user: dict) -> list:
+    # Students always submit as themselves (by email, as analytics have always keyed them);
+    # only teachers syncing a class may record attempts for someone else
+    records = []
+    for a in attempts:
+        record = a.dict()
+        if not (is_teacher(current_user) and record["student_id"]):
+            record["student_id"] = current_user["email"]
+        records.append(record)
+    try:
+        return await attempt_recorder.record_many(records)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid exam ID format")
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/api/attempts")
+async def submit_attempt(attempt: models.AttemptCreate, current_user: dict = Depends(get_current_user)):
+    """Grades a whole attempt (every answer in one request) for the signed-in student and returns the per-question results."""
+    attempt.student_id = None
+    return (await record_attempts([attempt], current_user))[0]
+
+@app.post("/api/attempts/batch")
+async def submit_attempts(batch: models.AttemptBatch, current_user: dict = Depends(get_current_user)):
+    """Grades several attempts at once, e.g. a class's submissions synced together by their teacher."""
+    return {"results": await record_attempts(batch.attempts, current_user)}
+
+def rate(doc: dict, total_field: str) -> dict:
+    doc["accuracy"] = round(doc.get("correct", 0) / doc[total_field], 3) if doc.get(total_field) else 0.0
+    return doc
+
+@app.get("/api/analytics/questions")
+async def get_question_stats(exam_id: Optional[str] = None, limit: int = 50):
+    """Per-question counters for an exam's questions, or the most attempted questions overall."""
+    if exam_id:
+        exam = await db.exams.find_one({"_id": parse_object_id(exam_id, "Invalid exam ID format")}, {"questions.id": 1})
+        if not exam:
+            raise HTTPException(status_code=404, detail="Exam not found")
+        keys = [{"exam_id": str(exam["_id"]), "question_id": q["id"]} for q in exam.get("questions", []) if q.get("id")]
+        cursor = db.question_stats.find({"_id": {"$in": keys}})
+    else:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        cursor = db.question_stats.find({}).sort("attempts", -1).limit(limit)
+
+    stats = []
+    async for doc in cursor:
+        key = doc.pop("_id")
+        # Exam questions are keyed by {exam_id, question_id}, bank questions by their id
+        doc.update(key if isinstance(key, dict) else {"question_id": key})
+        stats.append(rate(doc, "attempts"))
+    return stats
+
+@app.get("/api/analytics/topics")
+async def get_topic_performance():
+    stats = []
+    async for doc in db.topic_performance.find({}).sort([("_id.topic", 1), ("_id.subtopic", 1)]):
+        key = doc.pop("_id")
+        stats.append(rate({**key, **doc}, "answered"))
+    return stats
+
+@app.get("/api/analytics/students/{student_id}")
+async def get_student_stats(student_id: str, current_user: dict = Depends(get_current_user)):
+    """A student's counters; students can only see their own ('me' works for the signed-in user)."""
+    if student_id == "me":
+        student_id = current_user["email"]
+    if student_id != current_user["email"] and not is_teacher(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to view this student's analytics")
+    summary = await db.student_stats.find_one({"_id": student_id})
+    if not summary:
+        raise HTTPException(status_code=404, detail="No attempts recorded for this student")
+    summary["student_id"] = summary.pop("_id")
+
+    topics = []
+    async for doc in db.student_topic_stats.find({"_id.student_id": student_id}):
+        topics.append(rate({"topic": doc["_id"]["topic"], "answered": doc["answered"], "correct": doc["correct"]}, "answered"))
+    summary["topics"] = topics
+    return rate(summary, "answered")
+
+@app.get("/api/health")
+async def health():
+    """Per-model readiness. 'ready' once every model loaded at startup is ready; lazy models load on first use."""
+    models_status = model_registry.status()
+    eager = [m for m in models_status.values() if not m["lazy"]]
+    if any(m["state"] == "failed" for m in models_status.values()):
+        overall = "degraded"
+    elif all(m["state"] == "ready" for m in eager):
+        overall = "ready"
+    else:
+        overall = "loading"
+    return {"status": overall, "models": models_status}
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return cache.stats()
+
 @app.get("/")
 def read_root():
     return {"message": "AI Question Generator API is running"}
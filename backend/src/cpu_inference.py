@@ -0,0 +1,76 @@
+import os
+
+import torch
+
+
+def quantize_enabled(model_name: str) -> bool:
+    """
+    Whether dynamic int8 quantization is switched on for a model.
+    CPU_QUANTIZE=1 enables it for every model; a comma separated list
+    (e.g. CPU_QUANTIZE=generator,summarizer) enables it for those only.
+    """
+    setting = os.getenv("CPU_QUANTIZE", "0").strip().lower()
+    if setting in ("", "0", "false", "no"):
+        return False
+    if setting in ("1", "true", "yes", "all"):
+        return True
+    return model_name.lower() in {name.strip() for name in setting.split(",")}
+
+
+def optimize_for_cpu(model, quantize: bool = False):
+    """
+    Puts a model in eval mode and, if 'quantize' is set, replaces its Linear layers with
+    dynamically quantized int8 versions (weights stored as int8, activations quantized
+    on the fly). Roughly halves the resident size of transformer weights and speeds up
+    the matrix multiplies on CPUs with VNNI/AVX2; a no-op for models on GPU.
+    """
+    model.eval()
+    if not quantize:
+        return model
+    if next(model.parameters()).device.type != "cpu":
+        print("Skipping int8 quantization: model is not on CPU.")
+        return model
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def model_size_mb(model) -> float:
+    """Size of a model's weights (parameters, buffers and packed int8 weights) in MB."""
+    total = 0
+    for tensor in model.state_dict().values():
+        if isinstance(tensor, torch.Tensor):
+            total += tensor.numel() * tensor.element_size()
+        elif isinstance(tensor, tuple):
+            # Packed params of quantized Linear layers: (weight, bias)
+            total += sum(t.numel() * t.element_size() for t in tensor if isinstance(t, torch.Tensor))
+    return total / (1024 * 1024)
+
+
+def configure_interop_threads():
+    """
+    Applies TORCH_INTEROP_THREADS (process wide). Must run before any model does inference.
+    """
+    value = os.getenv("TORCH_INTEROP_THREADS")
+    if value:
+        try:
+            torch.set_num_interop_threads(int(value))
+        except RuntimeError as e:
+            # Already started (e.g. set twice in the same process)
+            print(f"Could not set inter-op threads: {e}")
+
+
+def intra_op_thread_initializer(model_name: str):
+    """
+    Returns an initializer for a model's inference worker threads that applies
+    TORCH_THREADS_<NAME> (falling back to TORCH_THREADS), or None if neither is set.
+    With PyTorch's OpenMP backend the thread count is per calling thread, so each model's
+    workers can get their own share of cores instead of every request contending for all of them.
+    """
+    value = os.getenv(f"TORCH_THREADS_{model_name.upper()}") or os.getenv("TORCH_THREADS")
+    if not value:
+        return None
+    num_threads = int(value)
+
+    def initializer():
+        torch.set_num_threads(num_threads)
+
+    return initializer
@@ -0,0 +1,112 @@
+import random
+import re
+import threading
+import zlib
+from typing import Optional
+
+# Hash values stay below 2^61 so signatures fit in MongoDB's signed 64-bit integers
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _integrate(f, a: float, b: float, steps: int = 200) -> float:
+    width = (b - a) / steps
+    return sum(f(a + (i + 0.5) * width) for i in range(steps)) * width
+
+
+def optimal_bands(num_perm: int, threshold: float) -> int:
+    """
+    Number of LSH bands (a divisor of num_perm) whose collision curve best matches 'threshold':
+    the one with the least combined probability of pairing texts below the threshold
+    (wasted comparisons) and of missing pairs above it. 64 permutations at 0.7 gives 8 bands of 8.
+    """
+    def error(bands):
+        rows = num_perm // bands
+        false_positives = _integrate(lambda s: 1 - (1 - s ** rows) ** bands, 0.0, threshold)
+        false_negatives = _integrate(lambda s: (1 - s ** rows) ** bands, threshold, 1.0)
+        return false_positives + false_negatives
+
+    return min((b for b in range(1, num_perm + 1) if num_perm % b == 0), key=error)
+
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate detection for questions using MinHash signatures and LSH banding.
+    Each text is reduced to a fixed-size signature; only texts that share at least one
+    band are compared, so checking a new question costs about the same no matter how
+    many questions have been indexed.
+
+    Signatures and band keys are deterministic (seeded hashes, no Python hash()),
+    so they can be stored alongside questions and compared across processes.
+    Band keys are prefixed with the banding 'scheme', so keys stored under other settings
+    can be told apart. By default the banding is derived from 'threshold' (see optimal_bands).
+    """
+    def __init__(self, num_perm: int = 64, bands: Optional[int] = None, threshold: float = 0.7, shingle_size: int = 4, seed: int = 1):
+        bands = bands or optimal_bands(num_perm, threshold)
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.scheme = f"{bands}x{self.rows}"
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._buckets = {}
+        self._signatures = []
+        self._lock = threading.RLock()
+
+    def _shingles(self, text: str) -> set[str]:
+        normalized = re.sub(r"[^a-z0-9 ]+", "", re.sub(r"\s+", " ", text.lower())).strip()
+        if len(normalized) <= self.shingle_size:
+            return {normalized}
+        return {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> list[int]:
+        hashes = [zlib.crc32(s.encode("utf-8")) & _MAX_HASH for s in self._shingles(text)]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def band_keys(self, signature: list[int]) -> list[str]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = zlib.crc32(",".join(map(str, rows)).encode("ascii"))
+            keys.append(f"{self.scheme}:{band}:{digest:08x}")
+        return keys
+
+    def similarity(self, sig_a: list[int], sig_b: list[int]) -> float:
+        """Estimated Jaccard similarity of the two texts' shingle sets."""
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / self.num_perm
+
+    def find_duplicate(self, signature: list[int]) -> Optional[int]:
+        """Returns the position of an indexed near-duplicate, if any."""
+        with self._lock:
+            candidates = set()
+            for key in self.band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            for position in candidates:
+                if self.similarity(signature, self._signatures[position]) >= self.threshold:
+                    return position
+        return None
+
+    def add(self, signature: list[int]) -> int:
+        with self._lock:
+            position = len(self._signatures)
+            self._signatures.append(signature)
+            for key in self.band_keys(signature):
+                self._buckets.setdefault(key, []).append(position)
+        return position
+
+    def check_and_add(self, text: str) -> bool:
+        """Indexes the text and returns True, or returns False if it duplicates an indexed text."""
+        signature = self.signature(text)
+        with self._lock:
+            if self.find_duplicate(signature) is not None:
+                return False
+            self.add(signature)
+        return True
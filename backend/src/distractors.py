@@ -0,0 +1,207 @@
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+
+class TermEmbedder:
+    """
+    Embeds short terms with a small sentence-embedding model on CPU.
+    Vectors are L2-normalized, so a dot product is the cosine similarity,
+    and recently used terms are cached so each term is embedded once.
+    """
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", batch_size: int = 64, cache_size: int = 20000):
+        print(f"Loading embedding model: {model_name}...")
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+        self.dim = self.model.config.hidden_size
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        print("Embedding model loaded.")
+
+    def embed(self, terms: list[str]) -> np.ndarray:
+        """Returns a (len(terms), dim) float32 matrix of normalized embeddings."""
+        if not terms:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        found = {}
+        with self._lock:
+            for term in set(terms):
+                if term in self._cache:
+                    self._cache.move_to_end(term)
+                    found[term] = self._cache[term]
+
+        missing = [t for t in dict.fromkeys(terms) if t not in found]
+        if missing:
+            vectors = self._encode(missing)
+            found.update(zip(missing, vectors))
+            with self._lock:
+                self._cache.update(zip(missing, vectors))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return np.stack([found[t] for t in terms])
+
+    def _encode(self, terms: list[str]) -> np.ndarray:
+        batches = []
+        with torch.inference_mode():
+            for start in range(0, len(terms), self.batch_size):
+                inputs = self.tokenizer(
+                    terms[start:start + self.batch_size],
+                    padding=True,
+                    truncation=True,
+                    max_length=32,
+                    return_tensors="pt"
+                )
+                hidden = self.model(**inputs).last_hidden_state
+
+                # Mean pooling over real (non-padding) tokens
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, dim=1)
+                batches.append(pooled.numpy().astype(np.float32))
+        return np.concatenate(batches)
+
+
+class VectorIndex:
+    """A flat in-memory index of term embeddings, searched with one matrix product."""
+    def __init__(self, dim: int, max_terms: int = None):
+        self.dim = dim
+        self.max_terms = max_terms
+        self.terms = []
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self._keys = set()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, terms: list[str], vectors: np.ndarray):
+        keep = []
+        for i, term in enumerate(terms):
+            key = term.lower()
+            if key not in self._keys:
+                self._keys.add(key)
+                keep.append(i)
+        if not keep:
+            return
+
+        self.terms.extend(terms[i] for i in keep)
+        self.matrix = np.vstack([self.matrix, vectors[keep]])
+
+        if self.max_terms and len(self.terms) > self.max_terms:
+            # Drop the oldest terms
+            overflow = len(self.terms) - self.max_terms
+            for term in self.terms[:overflow]:
+                self._keys.discard(term.lower())
+            self.terms = self.terms[overflow:]
+            self.matrix = self.matrix[overflow:]
+
+    def similarities(self, query_vectors: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every query to every term, shape (queries, terms)."""
+        return query_vectors @ self.matrix.T
+
+
+class DistractorEngine:
+    """
+    Picks distractors that are semantically related to the answer but not near-synonyms:
+    candidates whose similarity to the answer falls inside [low, high] are preferred.
+    Each chunk's nouns are embedded once into a per-document index; an optional
+    corpus-wide index (terms from every chunk seen so far) fills in when a chunk is too small.
+    """
+    def __init__(self, embedder: TermEmbedder, low: float = 0.3, high: float = 0.85,
+                 use_corpus_index: bool = False, corpus_max_terms: int = 20000, index_cache_size: int = 128):
+        self.embedder = embedder
+        self.low = low
+        self.high = high
+        self.corpus_index = VectorIndex(embedder.dim, max_terms=corpus_max_terms) if use_corpus_index else None
+        self.index_cache_size = index_cache_size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index_document(self, analysis) -> VectorIndex:
+        """Returns the (cached) vector index of a chunk's nouns."""
+        with self._lock:
+            index = self._indexes.get(analysis.text)
+            if index is not None:
+                self._indexes.move_to_end(analysis.text)
+                return index
+
+        terms = analysis.unique_nouns
+        vectors = self.embedder.embed(terms)
+        index = VectorIndex(self.embedder.dim)
+        index.add(terms, vectors)
+
+        with self._lock:
+            self._indexes[analysis.text] = index
+            while len(self._indexes) > self.index_cache_size:
+                self._indexes.popitem(last=False)
+            if self.corpus_index is not None:
+                self.corpus_index.add(terms, vectors)
+        return index
+
+    def get_distractors(self, answer: str, analysis, num_distractors: int = 3) -> list[str]:
+        return self.get_distractors_batch([answer], analysis, num_distractors)[0]
+
+    def get_distractors_batch(self, answers: list[str], analysis, num_distractors: int = 3) -> list[list[str]]:
+        """Selects distractors for several answers from the same chunk in one vectorized pass."""
+        if not answers:
+            return []
+
+        index = self.index_document(analysis)
+        answer_vectors = self.embedder.embed(answers)
+        doc_sims = index.similarities(answer_vectors)
+
+        corpus_sims = None
+        if self.corpus_index is not None and len(self.corpus_index):
+            with self._lock:
+                corpus_terms = list(self.corpus_index.terms)
+                corpus_sims = self.corpus_index.similarities(answer_vectors)
+
+        results = []
+        for row, answer in enumerate(answers):
+            chosen = self._pick(answer, index.terms, doc_sims[row], num_distractors, [])
+            if len(chosen) < num_distractors and corpus_sims is not None:
+                chosen = self._pick(answer, corpus_terms, corpus_sims[row], num_distractors, chosen)
+            if len(chosen) < num_distractors:
+                # Nothing left inside the band: take the closest remaining chunk terms below it
+                chosen = self._pick(answer, index.terms, doc_sims[row], num_distractors, chosen, in_band=False)
+            if len(chosen) < num_distractors:
+                chosen = chosen + ["None of the above"] * (num_distractors - len(chosen))
+            results.append(chosen)
+        return results
+
+    def _pick(self, answer: str, terms: list[str], sims: np.ndarray, num_distractors: int,
+              chosen: list[str], in_band: bool = True) -> list[str]:
+        answer_lower = answer.lower()
+        taken = {c.lower() for c in chosen}
+
+        if in_band:
+            order = np.flatnonzero((sims >= self.low) & (sims <= self.high))
+        else:
+            order = np.flatnonzero(sims < self.low)
+        order = order[np.argsort(-sims[order])]
+
+        candidates = []
+        for i in order:
+            term = terms[i]
+            term_lower = term.lower()
+            # Filter out the correct answer and similar strings
+            if term_lower == answer_lower or answer_lower in term_lower or term_lower in taken:
+                continue
+            candidates.append(term)
+            taken.add(term_lower)
+            if len(candidates) >= num_distractors * 2:
+                break
+
+        # Sample among the closest few so repeated answers don't always get the same options
+        needed = num_distractors - len(chosen)
+        if len(candidates) > needed:
+            candidates = random.sample(candidates, needed) if in_band else candidates[:needed]
+        return chosen + candidates
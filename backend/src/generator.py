@@ -1,24 +1,37 @@
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 import nltk
+from src.cpu_inference import optimize_for_cpu
 
 # Ensure nltk resources are downloaded (handled gracefully)
 try:
     nltk.data.find('tokenizers/punkt')
 except LookupError:
     nltk.download('punkt')
+# Newer NLTK releases load sentence tokenizer tables from punkt_tab
+try:
+    nltk.data.find('tokenizers/punkt_tab')
+except LookupError:
+    nltk.download('punkt_tab')
 
 class QuestionGenerator:
-    def __init__(self, model_name="valhalla/t5-base-qg-hl"):
+    def __init__(self, model_name="valhalla/t5-base-qg-hl", quantize: bool = False):
         """
         Initializes the T5 model for Question Generation.
+        'quantize' applies dynamic int8 quantization to the linear layers (CPU only).
         """
         print(f"Loading model: {model_name}...")
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Fast tokenizers switch truncation/padding state on every call and can't be shared
+        # across threads: chunking (off the inference pool) gets an instance of its own
+        self.chunk_tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
-        print(f"Model loaded on {self.device}.")
+        self.model = optimize_for_cpu(self.model, quantize=quantize)
+        self.quantized = quantize and self.device.type == "cpu"
+        print(f"Model loaded on {self.device}{' (int8)' if self.quantized else ''}.")
 
     def generate(self, text_context: str, num_questions: int = 5) -> list[str]:
         """
@@ -37,6 +50,27 @@ class QuestionGenerator:
         questions = self._run_model(input_text, num_questions=1)
         return questions[0] if questions else "What is related to " + answer + "?"
 
+    def generate_for_answers(self, answers: list[str], text_context: str, batch_size: int = 8) -> list[str]:
+        """
+        Generates one question per answer for a single context.
+        All prompts are padded and run through the model in batches of 'batch_size'.
+        """
+        return self.generate_for_chunks([(ans, text_context) for ans in answers], batch_size=batch_size)
+
+    def generate_for_chunks(self, pairs: list[tuple[str, str]], batch_size: int = 8) -> list[str]:
+        """
+        Generates one question per (answer, context) pair, across any number of chunks.
+        Returns questions in the same order as 'pairs'.
+        """
+        questions = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            input_texts = [f"answer: {answer} context: {context}" for answer, context in batch]
+            outputs = self._run_model_batch(input_texts)
+            for (answer, _), question in zip(batch, outputs):
+                questions.append(question or "What is related to " + answer + "?")
+        return questions
+
     def _run_model(self, input_text: str, num_questions: int) -> list[str]:
         inputs = self.tokenizer.encode(
             input_text, 
@@ -46,15 +80,16 @@ class QuestionGenerator:
         ).to(self.device)
 
         beam_count = max(5, num_questions)
-        outputs = self.model.generate(
-            inputs,
-            max_length=64,
-            num_beams=beam_count,
-            do_sample=True,
-            top_k=50,
-            top_p=0.95,
-            num_return_sequences=num_questions
-        )
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                inputs,
+                max_length=64,
+                num_beams=beam_count,
+                do_sample=True,
+                top_k=50,
+                top_p=0.95,
+                num_return_sequences=num_questions
+            )
 
         questions = []
         for output in outputs:
@@ -63,25 +98,137 @@ class QuestionGenerator:
                 questions.append(question)
         return questions
 
+    def _run_model_batch(self, input_texts: list[str]) -> list[str]:
+        # Pad the batch to its longest prompt so every prompt shares one generate() call
+        inputs = self.tokenizer(
+            input_texts,
+            return_tensors="pt",
+            padding=True,
+            max_length=512,
+            truncation=True
+        ).to(self.device)
+
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=64,
+                num_beams=5,
+                do_sample=True,
+                top_k=50,
+                top_p=0.95,
+                num_return_sequences=1
+            )
+        return [self.tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+
+
+def _count_tokens(texts: list[str], tokenizer=None) -> list[int]:
+    if tokenizer is None:
+        # Approximation when no tokenizer is given: 1 token ~ 4 chars
+        return [max(1, len(t) // 4) for t in texts]
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+class TextChunker:
+    """
+    Packs sentences into chunks of at most 'max_tokens' tokens, counted with the model's
+    tokenizer so nothing is silently truncated at encode time. Text is fed incrementally
+    (e.g. PDF pages as they are extracted) and every chunk that can no longer grow is returned.
+    'overlap' repeats up to that many tokens of trailing sentences at the start of the next chunk.
+    Text without a sentence break is held back for at most 'max_buffer_chars' (default about
+    two chunks' worth) before it is split anyway. Blocking: run feed() off the event loop.
+    """
+    def __init__(self, max_tokens: int = 400, tokenizer=None, overlap: int = 0, max_buffer_chars: int = None):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+        self.overlap = min(overlap, max_tokens // 2)
+        self.max_buffer_chars = max_buffer_chars or max_tokens * 8
+        self.buffer = ""  # text whose last sentence may still be incomplete
+        self.sentences = []  # (sentence, token count) pairs of the chunk being built
+        self.current_tokens = 0
+
+    def feed(self, piece: str) -> list[str]:
+        self.buffer += piece
+        sentences = nltk.sent_tokenize(self.buffer)
+        if len(sentences) < 2:
+            if len(self.buffer) > self.max_buffer_chars:
+                # No sentence break in sight (e.g. bullet-only PDF text); waiting for one would
+                # re-scan an ever-growing buffer on every piece
+                text, self.buffer = self.buffer, ""
+                return self._add_sentences([text])
+            return []
+        # The last sentence may continue in the next piece, so hold it back
+        self.buffer = self.buffer[self.buffer.rindex(sentences[-1]):]
+        return self._add_sentences(sentences[:-1])
+
+    def flush(self) -> list[str]:
+        chunks = self._add_sentences(nltk.sent_tokenize(self.buffer)) if self.buffer.strip() else []
+        self.buffer = ""
+        if self.sentences:
+            chunks.append(" ".join(sent for sent, _ in self.sentences))
+        self.sentences = []
+        self.current_tokens = 0
+        return chunks
+
+    def _add_sentences(self, sentences: list[str]) -> list[str]:
+        chunks = []
+        counts = _count_tokens(sentences, self.tokenizer) if sentences else []
+        for sent, num_tokens in zip(sentences, counts):
+            for part, part_tokens in self._split_long(sent, num_tokens):
+                if self.sentences and self.current_tokens + part_tokens > self.max_tokens:
+                    chunks.append(self._emit())
+                    # Carried-over sentences give way when they leave no room for the new part
+                    while self.sentences and self.current_tokens + part_tokens > self.max_tokens:
+                        _, dropped_tokens = self.sentences.pop(0)
+                        self.current_tokens -= dropped_tokens
+                self.sentences.append((part, part_tokens))
+                self.current_tokens += part_tokens
+        return chunks
+
+    def _emit(self) -> str:
+        chunk = " ".join(sent for sent, _ in self.sentences)
+
+        # Carry trailing sentences over as the start of the next chunk
+        kept = []
+        kept_tokens = 0
+        for sent, num_tokens in reversed(self.sentences):
+            if kept_tokens + num_tokens > self.overlap:
+                break
+            kept.insert(0, (sent, num_tokens))
+            kept_tokens += num_tokens
+        self.sentences = kept
+        self.current_tokens = kept_tokens
+        return chunk
+
+    def _split_long(self, sent: str, num_tokens: int) -> list[tuple[str, int]]:
+        if num_tokens <= self.max_tokens:
+            return [(sent, num_tokens)]
+
+        # A single sentence longer than a chunk (common in PDF text) is cut into token windows
+        if self.tokenizer is None:
+            width = self.max_tokens * 4
+            parts = [sent[i:i + width] for i in range(0, len(sent), width)]
+            return [(part, max(1, len(part) // 4)) for part in parts]
+
+        ids = self.tokenizer(sent, add_special_tokens=False)["input_ids"]
+        return [
+            (self.tokenizer.decode(ids[i:i + self.max_tokens]), len(ids[i:i + self.max_tokens]))
+            for i in range(0, len(ids), self.max_tokens)
+        ]
+
+
+def iter_chunks(pieces, max_tokens: int = 400, tokenizer=None, overlap: int = 0):
+    """Yields the chunks of a stream of text pieces as soon as each one is complete."""
+    chunker = TextChunker(max_tokens, tokenizer=tokenizer, overlap=overlap)
+    for piece in pieces:
+        yield from chunker.feed(piece)
+    yield from chunker.flush()
+
 
 # Helper function to split long text into processed chunks
-def chunk_text(text: str, max_tokens: int = 400) -> list[str]:
-    # Simple chunking by approximate words/sentences would be better, 
-    # but for now, we'll rely on sliding windows or simple paragraph splits 
-    # to avoid cutting sentences in half too badly.
-    paragraphs = text.split('\n\n')
-    chunks = []
-    current_chunk = ""
-    
-    for para in paragraphs:
-        if len(current_chunk) + len(para) < max_tokens * 4: # Approximation: 1 token ~ 4 chars
-            current_chunk += para + "\n\n"
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = para + "\n\n"
-            
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-        
-    return chunks
+def chunk_text(text: str, max_tokens: int = 400, tokenizer=None, overlap: int = 0) -> list[str]:
+    """
+    Splits text into sentence-aligned chunks of at most 'max_tokens' tokens.
+    Pass the model's tokenizer for exact counts; without one, 1 token ~ 4 chars is assumed.
+    """
+    return list(iter_chunks([text], max_tokens, tokenizer=tokenizer, overlap=overlap))
@@ -0,0 +1,143 @@
+import asyncio
+import codecs
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, BinaryIO, Iterator, Optional
+
+import pypdf
+
+# Size of the blocks used when copying uploads to disk and reading text files back
+BLOCK_SIZE = 1024 * 1024
+
+# Pages handed to a worker process at a time
+PAGES_PER_TASK = 8
+
+
+class SpooledUpload:
+    """An upload copied to a temporary file, along with the SHA-256 of its bytes."""
+
+    def __init__(self, path: str, filename: str, sha256: str, size: int):
+        self.path = path
+        self.filename = filename or ""
+        self.sha256 = sha256
+        self.size = size
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.filename.lower().endswith('.pdf')
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def spool_file(source: BinaryIO, filename: str) -> SpooledUpload:
+    """
+    Copies a file object to a temporary file block by block, hashing as it goes,
+    so the upload is never held in memory as a whole.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    suffix = os.path.splitext(filename or "")[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        while True:
+            block = source.read(BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            tmp.write(block)
+            size += len(block)
+    return SpooledUpload(tmp.name, filename, digest.hexdigest(), size)
+
+
+async def spool_upload(file) -> SpooledUpload:
+    """Spools a FastAPI UploadFile to disk without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, spool_file, file.file, file.filename)
+
+
+def create_page_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    # 'spawn' keeps the workers from inheriting the server's model threads and locks
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    # Runs in a worker process, so it opens its own reader
+    with open(path, 'rb') as f:
+        reader = pypdf.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(path: str, executor: Optional[Executor] = None, pages_per_task: int = PAGES_PER_TASK) -> Iterator[str]:
+    """
+    Yields the text of each non-empty page in order. With an executor, page ranges are
+    extracted in parallel and the first pages are yielded while later ones are still parsing.
+    """
+    # Passing an open file (not a path) lets pypdf read objects on demand instead of loading the whole file
+    with open(path, 'rb') as f:
+        reader = pypdf.PdfReader(f)
+        num_pages = len(reader.pages)
+
+        if executor is None or num_pages <= pages_per_task:
+            for page in reader.pages:
+                text = page.extract_text()
+                if text:
+                    yield text
+            return
+
+    futures = [
+        executor.submit(_extract_page_range, path, start, min(start + pages_per_task, num_pages))
+        for start in range(0, num_pages, pages_per_task)
+    ]
+    try:
+        for future in futures:
+            for text in future.result():
+                if text:
+                    yield text
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def iter_text_file(path: str, decode_errors: str = "strict") -> Iterator[str]:
+    """Yields a UTF-8 text file in blocks, decoding incrementally so characters are never split."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors=decode_errors)
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            text = decoder.decode(block)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_document_text(upload: SpooledUpload, executor: Optional[Executor] = None, decode_errors: str = "strict") -> Iterator[str]:
+    if upload.is_pdf:
+        # Pages are separated by a newline, as when the whole document is joined
+        return (page + "\n" for page in iter_pdf_pages(upload.path, executor))
+    # Assume text/plain
+    return iter_text_file(upload.path, decode_errors)
+
+
+async def aiter_document_text(upload: SpooledUpload, executor: Optional[Executor] = None, decode_errors: str = "strict") -> AsyncIterator[str]:
+    """
+    Async version of iter_document_text. Each piece is pulled on a worker thread,
+    so parsing never blocks the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    pieces = iter_document_text(upload, executor, decode_errors)
+    done = object()
+    while True:
+        piece = await loop.run_in_executor(None, next, pieces, done)
+        if piece is done:
+            return
+        yield piece
@@ -1,6 +1,7 @@
 import nltk
 import random
-from collections import Counter
+import threading
+from collections import Counter, OrderedDict
 
 # Download necessary NLTK data
 try:
@@ -11,36 +12,71 @@ try:
     nltk.data.find('taggers/averaged_perceptron_tagger')
 except LookupError:
     nltk.download('averaged_perceptron_tagger')
+# Newer NLTK releases load the tagger from its _eng variant
+try:
+    nltk.data.find('taggers/averaged_perceptron_tagger_eng')
+except LookupError:
+    nltk.download('averaged_perceptron_tagger_eng')
+
+class DocumentAnalysis:
+    """
+    Sentences, POS tags and noun frequencies of one chunk of text,
+    computed once and shared by answer and distractor selection.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.sentences = nltk.sent_tokenize(text)
+        self.tagged_sentences = [nltk.pos_tag(nltk.word_tokenize(sent)) for sent in self.sentences]
+
+        # Simple heuristic: filter for Nouns (NN, NNS, NNP, NNPS)
+        # Avoid single character words or very common stop words (basic filter)
+        nouns = [
+            word
+            for tags in self.tagged_sentences
+            for word, pos in tags
+            if pos.startswith('NN') and len(word) > 2
+        ]
+        self.noun_counts = Counter(nouns)
+
+    @property
+    def unique_nouns(self) -> list[str]:
+        return list(self.noun_counts)
+
 
 class MCQEngine:
-    def __init__(self):
-        pass
+    def __init__(self, analysis_cache_size: int = 256, distractor_engine=None):
+        # Optional embedding-based DistractorEngine; without one, distractors are random chunk nouns
+        self.distractor_engine = distractor_engine
+
+        # Recent chunk analyses, keyed by chunk text and evicted least recently used first
+        self.analysis_cache_size = analysis_cache_size
+        self._analyses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, text: str) -> DocumentAnalysis:
+        """
+        Returns the (cached) analysis of a chunk, so each chunk is tokenized and tagged only once.
+        """
+        with self._lock:
+            analysis = self._analyses.get(text)
+            if analysis is not None:
+                self._analyses.move_to_end(text)
+                return analysis
+
+        analysis = DocumentAnalysis(text)
+
+        with self._lock:
+            self._analyses[text] = analysis
+            while len(self._analyses) > self.analysis_cache_size:
+                self._analyses.popitem(last=False)
+        return analysis
 
     def get_candidate_answers(self, text: str, num_candidates: int = 5) -> list[str]:
         """
         Extracts nouns/noun phrases from text to serve as answers.
         Returns a list of unique strings.
         """
-        sentences = nltk.sent_tokenize(text)
-        candidates = []
-        
-        for sent in sentences:
-            words = nltk.word_tokenize(sent)
-            tags = nltk.pos_tag(words)
-            
-            # Simple heuristic: filter for Nouns (NN, NNS, NNP, NNPS)
-            # Avoid single character words or very common stop words (basic filter)
-            nouns = [word for word, pos in tags if pos.startswith('NN') and len(word) > 2]
-            candidates.extend(nouns)
-            
-        # Prioritize frequent nouns as they are likely key subjects
-        # But for variety, we might want random selection
-        # Let's count them to ensure they are "important" enough, but return unique list
-        counts = Counter(candidates)
-        
-        # Filter candidates that appear at least once (trivial) but maybe sort by frequency?
-        # unique_candidates = sorted(counts.keys(), key=lambda x: counts[x], reverse=True)
-        unique_candidates = list(set(candidates))
+        unique_candidates = self.analyze(text).unique_nouns
         
         # Randomly select to ensure variety if we have many
         if len(unique_candidates) > num_candidates:
@@ -50,10 +86,24 @@ class MCQEngine:
     def get_distractors(self, answer: str, context_text: str, num_distractors: int = 3) -> list[str]:
         """
         Generates wrong answers.
-        Strategy: Pick other nouns from the same text that are NOT the answer.
+        Strategy: Pick other nouns from the same text that are NOT the answer
+        (by semantic similarity with a distractor engine, otherwise at random).
         This provides contextually relevant but incorrect options.
         """
-        all_nouns = self.get_candidate_answers(context_text, num_candidates=50)
+        return self.get_distractors_batch([answer], context_text, num_distractors)[0]
+
+    def get_distractors_batch(self, answers: list[str], context_text: str, num_distractors: int = 3) -> list[list[str]]:
+        """
+        Generates distractors for several answers from the same chunk.
+        With a distractor engine, options are chosen by semantic similarity in one vectorized pass.
+        """
+        analysis = self.analyze(context_text)
+        if self.distractor_engine is not None:
+            return self.distractor_engine.get_distractors_batch(answers, analysis, num_distractors)
+        return [self._random_distractors(answer, analysis, num_distractors) for answer in answers]
+
+    def _random_distractors(self, answer: str, analysis: DocumentAnalysis, num_distractors: int) -> list[str]:
+        all_nouns = analysis.unique_nouns
         
         # Filter out the correct answer and similar strings
         options = [n for n in all_nouns if n.lower() != answer.lower() and answer.lower() not in n.lower()]
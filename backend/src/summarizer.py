@@ -1,30 +1,71 @@
-from transformers import pipeline
+from transformers import AutoTokenizer, pipeline
 import torch
+from src.cpu_inference import optimize_for_cpu
+from src.generator import chunk_text
+
+# Shown in place of a summary the model failed to produce
+FAILED_SUMMARY = "Failed to generate summary."
 
 class Summarizer:
-    def __init__(self, model_name="sshleifer/distilbart-cnn-12-6"):
+    def __init__(self, model_name="sshleifer/distilbart-cnn-12-6", quantize: bool = False, batch_size: int = 4,
+                 chunk_tokens: int = 900, reduce_max_length: int = 130, reduce_min_length: int = 30):
+        """
+        'chunk_tokens' is the size of each piece fed to the model (distilbart reads up to 1024 tokens);
+        'reduce_max_length'/'reduce_min_length' bound the intermediate summaries of the map-reduce
+        document summary (summarize_document in server.py, built on split and summarize_batch).
+        """
         print(f"Loading summarization model: {model_name}...")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.chunk_tokens = chunk_tokens
+        self.reduce_max_length = reduce_max_length
+        self.reduce_min_length = reduce_min_length
         device = 0 if torch.cuda.is_available() else -1
         self.summarizer = pipeline("summarization", model=model_name, device=device)
-        print("Summarization model loaded.")
+        self.tokenizer = self.summarizer.tokenizer
+        # The pipeline's tokenizer isn't safe to share across threads; chunking uses its own instance
+        self.chunk_tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Optional int8 linear layers for CPU inference
+        self.summarizer.model = optimize_for_cpu(self.summarizer.model, quantize=quantize)
+        self.quantized = quantize and device == -1
+        print(f"Summarization model loaded{' (int8)' if self.quantized else ''}.")
 
     def summarize(self, text: str, max_length: int = 130, min_length: int = 30) -> str:
         """
-        Summarizes the given text.
-        Handles long text by chunking (basic implementation).
+        Summarizes the given text in a single pass; input beyond the model's limit
+        (1024 tokens for distilbart) is truncated. Use split and summarize_batch for long text.
+        """
+        return self.summarize_batch([text], max_length=max_length, min_length=min_length)[0] or FAILED_SUMMARY
+
+    def summarize_batch(self, texts: list[str], max_length: int = 130, min_length: int = 30) -> list[str]:
+        """
+        Summarizes several texts, 'batch_size' at a time per forward pass.
+        Texts are ordered by length first so each batch pads to a similar length;
+        summaries are returned in the original order. If the model fails, every entry
+        is None, so callers can tell a failure from a summary (and never cache it).
         """
-        # Improved chunking for long texts could go here.
-        # For now, we utilize the pipeline's truncation or basic splitting.
-        
-        # Taking the first 1024 tokens worth of characters approx (4000 chars) 
-        # as a simple heuristic to avoid model input limits for now.
-        # Validation: distilbart limit is 1024 tokens.
-        
-        truncated_text = text[:4000] 
-        
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
         try:
-            summary_list = self.summarizer(truncated_text, max_length=max_length, min_length=min_length, do_sample=False)
-            return summary_list[0]['summary_text']
+            with torch.inference_mode():
+                summary_list = self.summarizer(
+                    [texts[i] for i in order],
+                    max_length=max_length,
+                    min_length=min_length,
+                    do_sample=False,
+                    truncation=True,
+                    batch_size=self.batch_size
+                )
+            summaries = [None] * len(texts)
+            for i, s in zip(order, summary_list):
+                summaries[i] = s['summary_text']
+            return summaries
         except Exception as e:
             print(f"Error during summarization: {e}")
-            return "Failed to generate summary."
+            return [None] * len(texts)
+
+    def split(self, text: str) -> list[str]:
+        """Splits text into sentence-aligned pieces that fit the model's input."""
+        return chunk_text(text, max_tokens=self.chunk_tokens, tokenizer=self.chunk_tokenizer)
+
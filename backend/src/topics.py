@@ -0,0 +1,152 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+# Topic -> subtopic -> indicative keywords. Topic names match the knowledge map's color groups.
+TAXONOMY = {
+    "Math": {
+        "Algebra": ["equation", "variable", "polynomial", "linear", "quadratic", "matrix", "vector", "expression", "coefficient", "factor", "inequality"],
+        "Calculus": ["derivative", "integral", "limit", "differentiation", "integration", "continuity", "function", "slope", "series", "convergence"],
+        "Geometry": ["triangle", "circle", "angle", "polygon", "area", "perimeter", "volume", "theorem", "coordinate", "parallel"],
+        "Statistics": ["probability", "mean", "median", "variance", "distribution", "sample", "hypothesis", "regression", "random", "deviation"],
+    },
+    "Science": {
+        "Physics": ["force", "energy", "motion", "velocity", "acceleration", "mass", "gravity", "momentum", "wave", "electric", "quantum", "particle"],
+        "Chemistry": ["atom", "molecule", "reaction", "element", "compound", "bond", "acid", "base", "electron", "periodic", "solution", "ion"],
+        "Biology": ["cell", "organism", "gene", "protein", "evolution", "species", "dna", "enzyme", "tissue", "photosynthesis", "ecosystem", "membrane"],
+        "Earth Science": ["rock", "mineral", "climate", "weather", "volcano", "earthquake", "ocean", "atmosphere", "plate", "erosion"],
+    },
+    "Computer Science": {
+        "Web Dev": ["html", "css", "javascript", "react", "browser", "server", "http", "api", "frontend", "backend", "dom", "component"],
+        "Data Structures": ["array", "list", "stack", "queue", "tree", "graph", "hash", "heap", "node", "pointer", "linked"],
+        "Algorithms": ["algorithm", "sorting", "search", "complexity", "recursion", "dynamic", "greedy", "runtime", "optimization", "iteration"],
+        "Databases": ["database", "query", "sql", "table", "index", "transaction", "schema", "record", "mongodb", "relational"],
+        "Machine Learning": ["model", "training", "neural", "network", "learning", "dataset", "prediction", "classification", "feature", "accuracy"],
+    },
+    "Humanities": {
+        "History": ["war", "empire", "revolution", "century", "king", "dynasty", "independence", "colonial", "treaty", "ancient"],
+        "Economics": ["market", "price", "demand", "supply", "trade", "inflation", "economy", "money", "tax", "capital"],
+        "Literature": ["poem", "novel", "author", "character", "story", "poetry", "narrative", "theme", "play", "writer"],
+        "Civics": ["government", "constitution", "law", "rights", "parliament", "election", "democracy", "citizen", "court", "policy"],
+    },
+}
+
+FALLBACK_LABEL = ("General", "Miscellaneous")
+
+_STOPWORDS = {
+    "the", "and", "that", "this", "with", "from", "which", "they", "their", "there", "have", "been", "were",
+    "what", "when", "where", "will", "would", "could", "should", "also", "into", "than", "then", "them",
+    "these", "those", "such", "each", "other", "more", "most", "some", "only", "over", "about", "after",
+    "before", "because", "while", "very", "many", "much", "used", "using", "called", "known",
+}
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def _terms(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS]
+
+
+class TopicClassifier:
+    """
+    Assigns a (topic, subtopic) label to each chunk of text.
+
+    Every subtopic is scored two ways, both computed for a whole batch of chunks
+    with a single matrix product:
+      - TF-IDF keyword overlap between the chunk and the subtopic's keywords;
+      - optionally, cosine similarity between the chunk's most frequent terms and
+        the subtopic description, using a TermEmbedder (zero-shot).
+    Labels are cached per chunk, so each chunk is classified once.
+    """
+    def __init__(self, embedder=None, taxonomy: dict = TAXONOMY, min_score: float = 0.05,
+                 top_terms: int = 20, cache_size: int = 1024):
+        self.embedder = embedder
+        self.min_score = min_score
+        self.top_terms = top_terms
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.labels = [(topic, subtopic) for topic, subtopics in taxonomy.items() for subtopic in subtopics]
+        keyword_lists = [taxonomy[topic][subtopic] for topic, subtopic in self.labels]
+
+        # Keyword vocabulary; a keyword shared by many subtopics carries less weight (IDF)
+        self.vocab = {}
+        for keywords in keyword_lists:
+            for word in keywords:
+                self.vocab.setdefault(word, len(self.vocab))
+        self.keyword_matrix = np.zeros((len(self.vocab), len(self.labels)), dtype=np.float32)
+        for col, keywords in enumerate(keyword_lists):
+            for word in keywords:
+                self.keyword_matrix[self.vocab[word], col] = 1.0
+        doc_freq = self.keyword_matrix.sum(axis=1, keepdims=True)
+        self.keyword_matrix *= np.log(1 + len(self.labels) / doc_freq)
+
+        self.label_vectors = None
+        if embedder is not None:
+            descriptions = [f"{subtopic}: {', '.join(keywords)}" for (_, subtopic), keywords in zip(self.labels, keyword_lists)]
+            self.label_vectors = embedder.embed(descriptions)
+
+    def classify(self, text: str) -> tuple[str, str]:
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, chunks: list[str]) -> list[tuple[str, str]]:
+        results = {}
+        with self._lock:
+            for chunk in chunks:
+                if chunk in self._cache:
+                    self._cache.move_to_end(chunk)
+                    results[chunk] = self._cache[chunk]
+
+        missing = [c for c in dict.fromkeys(chunks) if c not in results]
+        if missing:
+            labels = self._score(missing)
+            results.update(zip(missing, labels))
+            with self._lock:
+                self._cache.update(zip(missing, labels))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [results[c] for c in chunks]
+
+    def _score(self, chunks: list[str]) -> list[tuple[str, str]]:
+        term_counts = [Counter(_terms(chunk)) for chunk in chunks]
+
+        # Term frequencies over the keyword vocabulary, shape (chunks, vocab)
+        tf = np.zeros((len(chunks), len(self.vocab)), dtype=np.float32)
+        for row, counts in enumerate(term_counts):
+            total = sum(counts.values()) or 1
+            for word, n in counts.items():
+                col = self.vocab.get(word)
+                if col is None and word.endswith("s"):
+                    col = self.vocab.get(word[:-1])
+                if col is not None:
+                    tf[row, col] += n / total
+
+        scores = tf @ self.keyword_matrix
+        peak = scores.max(axis=1, keepdims=True)
+        scores = np.divide(scores, peak, out=np.zeros_like(scores), where=peak > 0)
+
+        if self.label_vectors is not None:
+            # Each chunk is represented by the frequency-weighted mean of its top terms
+            top = [[w for w, _ in counts.most_common(self.top_terms)] for counts in term_counts]
+            vocab = list(dict.fromkeys(w for words in top for w in words))
+            if vocab:
+                positions = {w: i for i, w in enumerate(vocab)}
+                term_vectors = self.embedder.embed(vocab)
+                weights = np.zeros((len(chunks), len(vocab)), dtype=np.float32)
+                for row, words in enumerate(top):
+                    for w in words:
+                        weights[row, positions[w]] = term_counts[row][w]
+                chunk_vectors = weights @ term_vectors
+                norms = np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+                chunk_vectors = np.divide(chunk_vectors, norms, out=np.zeros_like(chunk_vectors), where=norms > 0)
+                scores = scores + chunk_vectors @ self.label_vectors.T
+
+        labels = []
+        for row in scores:
+            best = int(row.argmax()) if len(row) else 0
+            labels.append(self.labels[best] if len(row) and row[best] >= self.min_score else FALLBACK_LABEL)
+        return labels
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def parse_video_id(url: str) -> str:
+    """Extracts the video id from youtube.com/watch?v=..., youtu.be/..., /shorts/ and /embed/ URLs."""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    candidate = None
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif "youtube" in host:
+        candidate = parse_qs(parsed.query).get("v", [None])[0]
+        if candidate is None:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                candidate = parts[1]
+    if not candidate or not _VIDEO_ID.match(candidate):
+        raise ValueError("Invalid YouTube URL format")
+    return candidate
+
+
+class YouTubeTransport:
+    """Fetches transcripts from YouTube. Blocking; TranscriptService runs it on worker threads."""
+
+    def fetch(self, video_id: str, languages: list[str]) -> tuple[str, str]:
+        """Returns (language code, transcript text) for the first available language."""
+        from youtube_transcript_api import YouTubeTranscriptApi
+
+        transcript = YouTubeTranscriptApi().list(video_id).find_transcript(languages)
+        snippets = transcript.fetch()
+        # Older releases return dicts, newer ones snippet objects
+        text = " ".join(s["text"] if isinstance(s, dict) else s.text for s in snippets)
+        return transcript.language_code, text
+
+
+class TranscriptService:
+    """
+    Shared YouTube transcript ingestion. Fetches run on a small thread pool so the event loop
+    never blocks on the network; transcripts are cached on disk per (video id, languages) for
+    'ttl' seconds; concurrent requests for the same video share one fetch. Cache reads are
+    small local files and are done inline, so a hit never waits behind a slow fetch. Expired
+    entries are deleted at most every 'prune_interval' seconds, on a later fetch.
+    'transport' is any object with fetch(video_id, languages) -> (language, text),
+    e.g. a local stand-in for tests.
+    """
+
+    def __init__(self, transport=None, cache_dir: Optional[str] = None, ttl: float = 7 * 24 * 3600,
+                 languages: tuple = ("en", "hi", "gu"), max_workers: int = 4, prune_interval: float = 3600):
+        self.transport = transport or YouTubeTransport()
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "queryquill-transcripts")
+        self.ttl = ttl
+        self.languages = list(languages)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transcripts")
+        self.prune_interval = prune_interval
+        self._inflight = {}
+        self._last_pruned = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_path(self, video_id: str, languages: list[str]) -> str:
+        return os.path.join(self.cache_dir, f"{video_id}.{'-'.join(languages)}.json")
+
+    def _read_cached(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.ttl:
+            return None
+        return entry
+
+    def prune(self) -> int:
+        """Deletes expired cache entries (and temp files left by interrupted writes). Returns how many."""
+        removed = 0
+        cutoff = time.time() - self.ttl
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                try:
+                    # Entries are written once, so the file's mtime is its fetch time
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self._last_pruned < self.prune_interval:
+            return
+        self._last_pruned = now
+        try:
+            removed = self.prune()
+        except OSError as e:
+            print(f"Pruning the transcript cache failed: {e}")
+            return
+        if removed:
+            print(f"Removed {removed} expired transcripts from the cache.")
+
+    def _fetch_and_store(self, video_id: str, languages: list[str], path: str) -> dict:
+        self._maybe_prune()
+        language, text = self.transport.fetch(video_id, languages)
+        entry = {"video_id": video_id, "language": language, "text": text, "fetched_at": time.time()}
+        # Write to a temp file and rename, so readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not cache transcript for {video_id}: {e}")
+        return entry
+
+    async def get(self, url: str, languages: Optional[list[str]] = None) -> str:
+        """Returns the transcript text of a YouTube URL. Raises ValueError for bad URLs or missing transcripts."""
+        video_id = parse_video_id(url)
+        languages = list(languages or self.languages)
+        path = self._cache_path(video_id, languages)
+        loop = asyncio.get_running_loop()
+
+        entry = self._read_cached(path)
+        if entry is not None:
+            return entry["text"]
+
+        key = (video_id, tuple(languages))
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(loop.run_in_executor(self._pool, self._fetch_and_store, video_id, languages, path))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        try:
+            entry = await asyncio.shield(future)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(str(e)) from e
+        return entry["text"]
+
+    def _forget(self, key, future):
+        self._inflight.pop(key, None)
+        # Errors reach every waiting caller; don't also log them as unretrieved
+        if not future.cancelled():
+            future.exception()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,20 +1,31 @@
 from transformers import pipeline
 from typing import Optional
+import torch
+from src.cpu_inference import optimize_for_cpu
+
+# Shown when no hint could be generated: the model isn't loaded, or generation failed
+NO_MODEL_HINT = "Consider reviewing the material related to this concept again."
+FAILED_HINT = "Re-read the question carefully and think about the core concepts."
 
 class SocraticTutor:
-    def __init__(self):
+    def __init__(self, model_name: str = "google/flan-t5-small", quantize: bool = False):
         # We will use a lightweight text-generation model for generating hints
         # For a true production app, you might use an API like OpenAI here,
         # but since we are keeping models local based on existing architecture:
         print("Loading SocraticTutor model...")
+        self.model_name = model_name
+        self.quantized = False
         try:
             # Using a very small instructional model for demonstration purposes
             self.model = pipeline(
                 "text2text-generation", 
-                model="google/flan-t5-small", # Using small for speed, use base or large if VRAM permits
+                model=model_name, # Using small for speed, use base or large if VRAM permits
                 device=-1 # CPU for now; change to 0 if GPU becomes available
             )
-            print("SocraticTutor model loaded.")
+            # Optional int8 linear layers for CPU inference
+            self.model.model = optimize_for_cpu(self.model.model, quantize=quantize)
+            self.quantized = quantize
+            print(f"SocraticTutor model loaded{' (int8)' if quantize else ''}.")
         except Exception as e:
             print(f"Error loading SocraticTutor model: {e}")
             self.model = None
@@ -23,26 +34,46 @@ class SocraticTutor:
         """
         Generates a Socratic hint without giving away the direct answer.
         """
+        hint = self.generate_hints([(question_text, wrong_answer_selected, correct_answer, context)])[0]
+        return hint or (FAILED_HINT if self.model else NO_MODEL_HINT)
+
+    def generate_hints(self, requests: list[tuple]) -> list[str]:
+        """
+        Generates hints for several (question_text, wrong_answer, correct_answer, context)
+        requests with one batched generate call. Returns hints in the same order; if the
+        model isn't loaded or generation fails, every entry is None so callers can fall back
+        without storing the fallback as if it were a generated hint.
+        """
         if not self.model:
-            return "Consider reviewing the material related to this concept again."
+            return [None] * len(requests)
+
+        prompts = [self._build_prompt(*request) for request in requests]
+        try:
+            with torch.inference_mode():
+                outputs = self.model(prompts, max_length=60, num_return_sequences=1, batch_size=len(prompts))
+        except Exception as e:
+            print(f"Error generating hint: {e}")
+            return [None] * len(requests)
+
+        hints = []
+        for (_, wrong_answer_selected, _, _), output in zip(requests, outputs):
+            # Lists of inputs may come back as one list of candidates per prompt
+            if isinstance(output, list):
+                output = output[0]
+            hint = output['generated_text']
+
+            # Formatting cleanup in case the model hallucinates
+            if not hint.strip() or len(hint) < 10:
+                hint = f"Think about why {wrong_answer_selected} might not fit the context provided."
+            hints.append(hint)
+        return hints
 
+    def _build_prompt(self, question_text: str, wrong_answer_selected: str, correct_answer: str, context: Optional[str] = "") -> str:
         # Prompt formatting for FLAN-T5
-        prompt = (
+        context = context or ""
+        return (
             f"You are a helpful tutor. The student was asked: '{question_text}' "
             f"The correct answer is '{correct_answer}', but the student guessed '{wrong_answer_selected}'. "
             f"Based on this context: '{context[:200]}...', provide a very short, one sentence hint or leading "
             f"question that helps them realize why '{wrong_answer_selected}' is wrong, without telling them the answer is '{correct_answer}'."
         )
-
-        try:
-            output = self.model(prompt, max_length=60, num_return_sequences=1)
-            hint = output[0]['generated_text']
-            
-            # Formatting cleanup in case the model hallucinates
-            if not hint.strip() or len(hint) < 10:
-                hint = f"Think about why {wrong_answer_selected} might not fit the context provided."
-                
-            return hint
-        except Exception as e:
-            print(f"Error generating hint: {e}")
-            return "Re-read the question carefully and think about the core concepts."
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("bson")
+pytest.importorskip("pymongo")
+
+from bson import ObjectId
+
+from analytics import AttemptRecorder, grade_answer
+
+EXAM_ID = str(ObjectId())
+EXAM = {
+    "_id": ObjectId(EXAM_ID),
+    "questions": [
+        {"id": "1", "type": "mcq", "answer": "Paris", "topic": "Geography"},
+        {"id": "2", "type": "qa", "answer": "Photosynthesis", "topic": "Biology", "subtopic": "Plants"},
+        {"id": "3", "type": "mcq", "answer": "4", "topic": "Math"},
+    ],
+}
+BANK_ID = str(ObjectId())
+BANK_QUESTION = {"_id": ObjectId(BANK_ID), "type": "mcq", "answer": "Oxygen", "topic": "Chemistry"}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeExams:
+    def __init__(self):
+        self.lookups = 0
+
+    async def find_one(self, query, projection=None):
+        self.lookups += 1
+        return EXAM if query["_id"] == EXAM["_id"] else None
+
+
+class FakeQuestions:
+    def find(self, query, projection=None):
+        return FakeCursor([BANK_QUESTION] if BANK_QUESTION["_id"] in query["_id"]["$in"] else [])
+
+
+class FakeDB:
+    def __init__(self):
+        self.exams = FakeExams()
+        self.questions = FakeQuestions()
+
+
+class FakeWriter:
+    def __init__(self):
+        self.docs = []
+
+    def add(self, docs):
+        self.docs.extend(docs)
+        return [ObjectId() for _ in docs]
+
+
+class FakeStats:
+    def __init__(self):
+        self.added = []
+
+    def add(self, collection, key, increments, latest=None):
+        self.added.append((collection, key, increments))
+
+    def keys(self, collection):
+        return [key for name, key, _ in self.added if name == collection]
+
+
+@pytest.fixture
+def recorder():
+    return AttemptRecorder(FakeDB(), FakeWriter(), FakeStats())
+
+
+def record(recorder, *attempts):
+    return asyncio.run(recorder.record_many(list(attempts)))
+
+
+def exam_attempt(answers, student_id="ann@example.com"):
+    return {
+        "student_id": student_id,
+        "exam_id": EXAM_ID,
+        "answers": [{"question_id": qid, "answer": answer} for qid, answer in answers],
+    }
+
+
+def test_grade_answer():
+    assert grade_answer({"type": "mcq", "answer": "Paris"}, "Paris")
+    assert not grade_answer({"type": "mcq", "answer": "Paris"}, "paris")
+    assert grade_answer({"type": "qa", "answer": "Photosynthesis"}, "  photosynthesis ")
+    assert not grade_answer({"type": "qa", "answer": ""}, "")
+
+
+def test_exam_attempt_is_graded_against_the_whole_exam(recorder):
+    (result,) = record(recorder, exam_attempt([("1", "Paris"), ("2", "photosynthesis")]))
+    assert (result["score"], result["total"], result["xp"]) == (2, 3, 20)
+    assert [r["question_id"] for r in result["results"]] == ["1", "2"]
+    assert result["attempt_id"]
+
+
+def test_repeated_answers_count_once(recorder):
+    (result,) = record(recorder, exam_attempt([("1", "Paris")] * 10 + [("3", "5"), ("3", "4")]))
+    # The last answer to each question counts
+    assert (result["score"], result["total"]) == (2, 3)
+    assert len(result["results"]) == 2
+    assert len(recorder.stats.keys("question_stats")) == 2
+
+
+def test_score_never_exceeds_total(recorder):
+    answers = [(q["id"], q["answer"]) for q in EXAM["questions"]] * 5
+    (result,) = record(recorder, exam_attempt(answers))
+    assert result["score"] == result["total"] == 3
+
+
+def test_answers_outside_the_exam_are_ignored(recorder):
+    (result,) = record(recorder, exam_attempt([("1", "Paris"), (BANK_ID, "Oxygen"), ("99", "x")]))
+    assert (result["score"], result["total"]) == (1, 3)
+    assert [r["question_id"] for r in result["results"]] == ["1"]
+
+
+def test_bank_attempts_are_graded_on_answered_questions(recorder):
+    (result,) = record(recorder, {
+        "student_id": "ann@example.com",
+        "exam_id": None,
+        "answers": [{"question_id": BANK_ID, "answer": "Oxygen"}, {"question_id": "1", "answer": "Paris"}],
+    })
+    assert (result["score"], result["total"]) == (1, 1)
+    assert recorder.stats.keys("question_stats") == [BANK_ID]
+
+
+def test_exam_question_stats_are_keyed_by_exam(recorder):
+    record(recorder, exam_attempt([("1", "Paris")]))
+    assert recorder.stats.keys("question_stats") == [{"exam_id": EXAM_ID, "question_id": "1"}]
+
+
+def test_answer_key_is_loaded_once_per_batch(recorder):
+    results = record(
+        recorder,
+        exam_attempt([("1", "Paris")], student_id="ann@example.com"),
+        exam_attempt([("1", "Rome")], student_id="bob@example.com"),
+    )
+    assert [r["score"] for r in results] == [1, 0]
+    assert recorder.db.exams.lookups == 1
+    assert [doc["student_id"] for doc in recorder.attempt_writer.docs] == ["ann@example.com", "bob@example.com"]
+
+
+def test_unknown_exam_raises_lookup_error(recorder):
+    attempt = exam_attempt([("1", "Paris")])
+    attempt["exam_id"] = str(ObjectId())
+    with pytest.raises(LookupError):
+        record(recorder, attempt)
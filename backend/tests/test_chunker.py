@@ -0,0 +1,75 @@
+import pytest
+
+# src.generator imports the model stack at module level
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("nltk")
+
+from src.generator import TextChunker, chunk_text
+
+
+class WordTokenizer:
+    """One token per word, so token counts are easy to reason about."""
+
+    def __init__(self):
+        self.words = []
+
+    def _encode(self, text):
+        ids = []
+        for word in text.split():
+            self.words.append(word)
+            ids.append(len(self.words) - 1)
+        return ids
+
+    def __call__(self, texts, add_special_tokens=False):
+        if isinstance(texts, str):
+            return {"input_ids": self._encode(texts)}
+        return {"input_ids": [self._encode(text) for text in texts]}
+
+    def decode(self, ids):
+        return " ".join(self.words[i] for i in ids)
+
+
+def sentence(words, label="w"):
+    return " ".join(f"{label}{i}" for i in range(words - 1)) + " end."
+
+
+def count(text):
+    return len(text.split())
+
+
+def test_chunks_stay_within_max_tokens():
+    text = " ".join(sentence(n, label) for n, label in [(150, "a"), (150, "b"), (100, "c"), (390, "d")])
+    chunks = chunk_text(text, max_tokens=400, tokenizer=WordTokenizer())
+    assert [count(c) for c in chunks] == [400, 390]
+
+
+def test_overlap_never_pushes_a_chunk_past_max_tokens():
+    text = " ".join(sentence(n, label) for n, label in [(150, "a"), (150, "b"), (100, "c"), (390, "d"), (50, "e")])
+    chunks = chunk_text(text, max_tokens=400, tokenizer=WordTokenizer(), overlap=200)
+    assert all(count(c) <= 400 for c in chunks)
+    # The 390-token sentence leaves no room for the carried-over one, and is too long to carry itself
+    assert [c.split()[0] for c in chunks] == ["a0", "d0", "e0"]
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = " ".join(sentence(100, label) for label in "abcde")
+    chunks = chunk_text(text, max_tokens=300, tokenizer=WordTokenizer(), overlap=100)
+    assert [c.split()[0] for c in chunks] == ["a0", "c0"]
+    assert all(count(c) <= 300 for c in chunks)
+
+
+def test_long_sentences_are_split_into_token_windows():
+    chunks = chunk_text(sentence(1000), max_tokens=400, tokenizer=WordTokenizer())
+    assert [count(c) for c in chunks] == [400, 400, 200]
+
+
+def test_text_without_sentence_breaks_is_not_buffered_forever():
+    chunker = TextChunker(max_tokens=50, tokenizer=WordTokenizer(), max_buffer_chars=200)
+    chunks = []
+    for _ in range(20):
+        chunks.extend(chunker.feed("bullet point without a stop "))
+        assert len(chunker.buffer) <= 200
+    chunks.extend(chunker.flush())
+    assert all(count(c) <= 50 for c in chunks)
+    assert sum(count(c) for c in chunks) == 20 * 5
@@ -0,0 +1,52 @@
+import pytest
+
+from src.dedup import MinHashDeduplicator, optimal_bands
+
+QUESTION = "What is the primary function of mitochondria in eukaryotic cells?"
+
+
+def test_optimal_bands_for_default_settings():
+    assert optimal_bands(64, 0.7) == 8
+    assert MinHashDeduplicator().scheme == "8x8"
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        MinHashDeduplicator(num_perm=64, bands=7)
+
+
+def test_signatures_are_deterministic():
+    assert MinHashDeduplicator().signature(QUESTION) == MinHashDeduplicator().signature(QUESTION)
+    assert all(value < 2 ** 63 for value in MinHashDeduplicator().signature(QUESTION))
+
+
+def test_band_keys_carry_the_scheme():
+    dedup = MinHashDeduplicator(num_perm=64, bands=16)
+    keys = dedup.band_keys(dedup.signature(QUESTION))
+    assert len(keys) == 16
+    assert all(key.startswith("16x4:") for key in keys)
+    assert set(keys).isdisjoint(MinHashDeduplicator().band_keys(MinHashDeduplicator().signature(QUESTION)))
+
+
+def test_near_duplicates_are_rejected():
+    dedup = MinHashDeduplicator()
+    assert dedup.check_and_add(QUESTION)
+    assert not dedup.check_and_add(QUESTION)
+    # Case, spacing and punctuation are ignored; small rewordings still match
+    assert not dedup.check_and_add("what is the  PRIMARY function of mitochondria in eukaryotic cells")
+    assert not dedup.check_and_add("What is the primary function of the mitochondria in eukaryotic cells?")
+
+
+def test_unrelated_questions_are_kept():
+    dedup = MinHashDeduplicator()
+    assert dedup.check_and_add(QUESTION)
+    assert dedup.check_and_add("Who wrote the Declaration of Independence?")
+    assert dedup.check_and_add("Explain how photosynthesis converts light into chemical energy.")
+
+
+def test_find_duplicate_returns_the_indexed_position():
+    dedup = MinHashDeduplicator()
+    dedup.add(dedup.signature("Who wrote the Declaration of Independence?"))
+    position = dedup.add(dedup.signature(QUESTION))
+    assert dedup.find_duplicate(dedup.signature(QUESTION + " ")) == position
+    assert dedup.find_duplicate(dedup.signature("Name the largest planet in the solar system.")) is None
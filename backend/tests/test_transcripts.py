@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.transcripts import TranscriptService, parse_video_id
+
+VIDEO_ID = "dQw4w9WgXcQ"
+URL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+class FakeTransport:
+    """Counts fetches; optionally blocks until released, to hold a fetch in flight."""
+
+    def __init__(self, text="hello world", error=None):
+        self.text = text
+        self.error = error
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def fetch(self, video_id, languages):
+        self.calls.append((video_id, list(languages)))
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return languages[0], self.text
+
+
+def make_service(tmp_path, transport, **kwargs):
+    return TranscriptService(transport=transport, cache_dir=str(tmp_path), **kwargs)
+
+
+@pytest.mark.parametrize("url", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}&t=10",
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/embed/{VIDEO_ID}",
+])
+def test_parse_video_id(url):
+    assert parse_video_id(url) == VIDEO_ID
+
+
+@pytest.mark.parametrize("url", ["https://example.com/watch?v=dQw4w9WgXcQ", "https://youtu.be/short", "not a url"])
+def test_parse_video_id_rejects_other_urls(url):
+    with pytest.raises(ValueError):
+        parse_video_id(url)
+
+
+def test_second_get_is_served_from_cache(tmp_path):
+    transport = FakeTransport()
+    service = make_service(tmp_path, transport)
+
+    async def run():
+        return await service.get(URL), await service.get(URL)
+
+    assert asyncio.run(run()) == ("hello world", "hello world")
+    assert len(transport.calls) == 1
+    service.shutdown()
+
+
+def test_cache_survives_a_new_service(tmp_path):
+    first = make_service(tmp_path, FakeTransport())
+    asyncio.run(first.get(URL))
+    first.shutdown()
+
+    transport = FakeTransport(text="changed")
+    service = make_service(tmp_path, transport)
+    assert asyncio.run(service.get(URL)) == "hello world"
+    assert transport.calls == []
+    service.shutdown()
+
+
+def test_languages_are_cached_separately(tmp_path):
+    transport = FakeTransport()
+    service = make_service(tmp_path, transport)
+
+    async def run():
+        await service.get(URL, ["en"])
+        await service.get(URL, ["hi"])
+
+    asyncio.run(run())
+    assert [languages for _, languages in transport.calls] == [["en"], ["hi"]]
+    service.shutdown()
+
+
+def test_expired_entries_are_fetched_again(tmp_path):
+    transport = FakeTransport()
+    service = make_service(tmp_path, transport, ttl=60)
+    asyncio.run(service.get(URL))
+
+    path = service._cache_path(VIDEO_ID, service.languages)
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["fetched_at"] -= 120
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+    transport.text = "fresh"
+    assert asyncio.run(service.get(URL)) == "fresh"
+    assert len(transport.calls) == 2
+    service.shutdown()
+
+
+def test_prune_removes_only_expired_entries(tmp_path):
+    service = make_service(tmp_path, FakeTransport(), ttl=60)
+    old = tmp_path / "old.en.json"
+    new = tmp_path / "new.en.json"
+    old.write_text("{}")
+    new.write_text("{}")
+    long_ago = time.time() - 120
+    os.utime(old, (long_ago, long_ago))
+
+    assert service.prune() == 1
+    assert not old.exists()
+    assert new.exists()
+    service.shutdown()
+
+
+def test_fetches_prune_at_most_once_per_interval(tmp_path):
+    service = make_service(tmp_path, FakeTransport(), ttl=60, prune_interval=3600)
+    pruned = []
+    service.prune = lambda: pruned.append(1) or 0
+
+    async def run():
+        await service.get(URL, ["en"])
+        await service.get(URL, ["hi"])
+
+    asyncio.run(run())
+    assert len(pruned) == 1
+    service.shutdown()
+
+
+def test_concurrent_requests_share_one_fetch(tmp_path):
+    transport = FakeTransport()
+    transport.release.clear()
+    service = make_service(tmp_path, transport)
+
+    async def run():
+        waiters = [asyncio.ensure_future(service.get(URL)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        transport.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == ["hello world"] * 5
+    assert len(transport.calls) == 1
+    assert service._inflight == {}
+    service.shutdown()
+
+
+def test_fetch_errors_reach_every_caller_as_value_errors(tmp_path):
+    transport = FakeTransport(error=RuntimeError("no transcript"))
+    transport.release.clear()
+    service = make_service(tmp_path, transport)
+
+    async def run():
+        waiters = [asyncio.ensure_future(service.get(URL)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        transport.release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert all(isinstance(e, ValueError) and "no transcript" in str(e) for e in errors)
+    assert len(transport.calls) == 1
+
+    # Failures are not cached
+    transport.error = None
+    assert asyncio.run(service.get(URL)) == "hello world"
+    service.shutdown()
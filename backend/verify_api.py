@@ -1,10 +1,31 @@
 import requests
 import os
+import time
 
 BASE_URL = "http://localhost:8000"
 
+def wait_until_ready(timeout=600):
+    """Models load in the background after startup; wait until /api/health reports them ready."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            health = requests.get(f"{BASE_URL}/api/health").json()
+        except requests.exceptions.ConnectionError:
+            health = {"status": "unreachable"}
+        if health["status"] == "ready":
+            return True
+        if health["status"] == "degraded":
+            print(f"[FAILED] A model failed to load: {health['models']}")
+            return False
+        print(f"Waiting for models to load ({health['status']})...")
+        time.sleep(5)
+    print("[FAILED] Models did not load in time")
+    return False
+
 def test_api():
     print("Testing API endpoints...")
+    if not wait_until_ready():
+        return
     try:
         # 1. Test Generate Questions (Original)
         print("\n=== Testing POST /api/generate ===")
@@ -3,7 +3,7 @@ import Button from '../../components/UI/Button';
 import Input from '../../components/UI/Input';
 import Card from '../../components/UI/Card';
 import { Clock, FileText, CheckCircle, AlertCircle, ArrowRight, Timer } from 'lucide-react';
-import { getExam } from '../../services/api';
+import { getExam, submitAttempt } from '../../services/api';
 import clsx from 'clsx';
 import { useStats } from '../../context/StatsContext';
 
@@ -88,10 +88,30 @@ const ExamAttempt = () => {
     setAnswers(prev => ({ ...prev, [qId]: value }));
   };
 
-  const handleSubmit = () => {
+  const handleSubmit = async () => {
     if (status !== 'taking') return;
     if (confirm("Are you sure you want to finish the exam?")) {
       setStatus('submitted');
+
+      // Exams from the server are graded there, feeding the teacher's analytics
+      if (exam?.id && exam !== MOCK_EXAM) {
+        try {
+          const result = await submitAttempt({
+            exam_id: exam.id,
+            answers: exam.questions
+              .filter(q => answers[q.id] !== undefined)
+              .map(q => ({
+                question_id: String(q.id),
+                answer: q.options ? q.options[answers[q.id]] : answers[q.id]
+              }))
+          });
+          awardXP(result.xp, 'exam');
+          return;
+        } catch (err) {
+          console.error("Failed to submit attempt:", err);
+        }
+      }
+
       // Calculate basic mock score XP
       const answeredCount = Object.keys(answers).length;
       const total = exam?.questions?.length || 1;
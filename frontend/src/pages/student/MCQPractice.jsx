@@ -55,6 +55,7 @@ const MCQPractice = () => {
       if (data && data.length > 0) {
           const formattedQuestions = data.map((item, index) => ({
              id: item.id || index,
+             questionId: item.id,
              question: item.text,
              options: item.options,
              correct: item.options.indexOf(item.answer),
@@ -87,9 +88,10 @@ const MCQPractice = () => {
     try {
       const data = await generateQuestions(file);
       // Transform API response to match component state structure
-      // API returns: { results: [{ type: 'mcq', question, options, answer, context }] }
+      // API returns: { results: [{ id, type: 'mcq', text, options, answer, chunk_id }] }
       const formattedQuestions = data.results.map((item, index) => ({
         id: index,
+        questionId: item.id,
         question: item.text, // Use item.text as per backend structure
         options: item.options,
         correct: item.options.indexOf(item.answer), 
@@ -130,7 +132,8 @@ const MCQPractice = () => {
           question_text: question.question || "This question",
           wrong_answer: question.options[index] || "an incorrect option",
           correct_answer: question.options[question.correct] || "the correct answer",
-          context: question.context || ""
+          context: question.context || "",
+          question_id: question.questionId || null // the server resolves the context and any precomputed hint
         };
         const response = await getTutorHint(payload);
         setTutorHint(response.hint);
@@ -159,7 +159,7 @@ const TeacherDashboard = () => {
                     <div className="font-medium text-gray-900">{item.title}</div>
                     <div className="text-xs text-gray-400 font-mono mt-0.5">ID: {item.id}</div>
                   </td>
-                  <td className="px-6 py-4 text-sm text-gray-500">{item.questions?.length || 0}</td>
+                  <td className="px-6 py-4 text-sm text-gray-500">{item.question_count ?? item.questions?.length ?? 0}</td>
                   <td className="px-6 py-4">
                     <span className="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-green-100 text-green-800">
                       Active
@@ -203,7 +203,7 @@ const TeacherDashboard = () => {
               <div className="grid grid-cols-2 gap-2 text-sm text-gray-500">
                 <div className="flex flex-col">
                   <span className="text-xs text-gray-400 uppercase tracking-wider">Questions</span>
-                  <span>{item.questions?.length || 0}</span>
+                  <span>{item.question_count ?? item.questions?.length ?? 0}</span>
                 </div>
                 <div className="flex flex-col">
                    <span className="text-xs text-gray-400 uppercase tracking-wider">Submissions</span>
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { generateQuestions, createExam } from '../../services/api';
+import { startGenerationJob, waitForJob, createExam } from '../../services/api';
 import Button from '../../components/UI/Button';
 import Card from '../../components/UI/Card';
 import { UploadCloud, Edit2, RefreshCw, Trash2, CheckCircle, Save, ArrowRight, Layout, Type, Youtube } from 'lucide-react';
@@ -44,35 +44,39 @@ const ExamGenerator = () => {
     }
 
     setLoading(true);
+    setQuestions([]);
     try {
       // Determine mode based on selection. Priority: MCQ > Short Answer (QA)
       // Future improvement: Support mixed modes by making parallel requests
       const mode = config.types.mcq ? 'mcq' : 'qa';
 
-      const data = await generateQuestions(file, config.count, mode, youtubeUrl);
-      console.log("API Response Data:", data);
-
-      const formattedQuestions = data.results.map((item, index) => {
-        const baseQuestion = {
-          id: index + 1,
-          question: item.text,
-          type: item.type === 'mcq' ? 'mcq' : 'short', // Mapping 'qa' to 'short'
-        };
-
-        if (item.type === 'mcq') {
-          return {
-            ...baseQuestion,
-            options: item.options,
-            correct: item.options.indexOf(item.answer), // Frontend expects index
-            answerText: item.answer // Store text just in case
+      const { job_id } = await startGenerationJob(file, config.count, mode, youtubeUrl);
+
+      // Questions stream in chunk by chunk; show the editor as soon as the first ones arrive
+      let nextId = 1;
+      await waitForJob(job_id, (results) => {
+        const formattedQuestions = results.map((item) => {
+          const baseQuestion = {
+            id: nextId++,
+            question: item.text,
+            type: item.type === 'mcq' ? 'mcq' : 'short', // Mapping 'qa' to 'short'
           };
-        }
 
-        return baseQuestion;
-      });
+          if (item.type === 'mcq') {
+            return {
+              ...baseQuestion,
+              options: item.options,
+              correct: item.options.indexOf(item.answer), // Frontend expects index
+              answerText: item.answer // Store text just in case
+            };
+          }
 
-      setQuestions(formattedQuestions);
-      setStep(2);
+          return baseQuestion;
+        });
+
+        setQuestions(qs => [...qs, ...formattedQuestions]);
+        setStep(2);
+      });
     } catch (error) {
       console.error("Generation failed:", error);
       alert("Failed to generate questions: " + error.message);
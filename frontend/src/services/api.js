@@ -24,6 +24,53 @@ export const generateQuestions = async (file, numQuestions = 5, mode = 'mcq', yo
     return response.json();
 };
 
+export const startGenerationJob = async (file, numQuestions = 5, mode = 'mcq', youtubeUrl = null) => {
+    const formData = new FormData();
+    if (file) {
+        formData.append('file', file);
+    }
+    if (youtubeUrl) {
+        formData.append('youtube_url', youtubeUrl);
+    }
+    formData.append('num_questions', numQuestions);
+    formData.append('mode', mode);
+
+    const response = await fetch(`${API_URL}/generate/jobs`, {
+        method: 'POST',
+        body: formData,
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || 'Failed to start question generation');
+    }
+
+    return response.json();
+};
+
+export const getJob = async (jobId, since = 0) => {
+    const response = await fetch(`${API_URL}/jobs/${jobId}?since=${since}`);
+    if (!response.ok) throw new Error('Failed to fetch job status');
+    return response.json();
+};
+
+// Polls a generation job, calling onResults with each new batch of results until it finishes
+export const waitForJob = async (jobId, onResults, intervalMs = 1000) => {
+    let since = 0;
+    while (true) {
+        const job = await getJob(jobId, since);
+        if (job.results.length) {
+            onResults(job.results, job);
+        }
+        since = job.next;
+
+        if (job.status === 'completed') return job;
+        if (job.status === 'failed') throw new Error(job.error || 'Generation failed');
+
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+};
+
 export const generateSummary = async (payload) => {
     // Payload can be FormData or { text: string }
 
@@ -83,11 +130,16 @@ export const getKnowledgeMap = async () => {
     return response.json();
 };
 
-export const getQuestions = async (type = null) => {
-    let url = `${API_URL}/questions`;
+export const getQuestions = async (type = null, { includeContext = false } = {}) => {
+    const params = new URLSearchParams();
     if (type) {
-        url += `?type=${type}`;
+        params.append('type', type);
+    }
+    if (includeContext) {
+        params.append('include_context', 'true');
     }
+    const query = params.toString();
+    const url = query ? `${API_URL}/questions?${query}` : `${API_URL}/questions`;
     const response = await fetch(url);
     if (!response.ok) throw new Error('Failed to fetch questions');
     return response.json();
@@ -99,6 +151,41 @@ export const getExams = async () => {
     return response.json();
 };
 
+// Builds an exam on the server from the question bank, e.g.
+// { title, sections: [{ topic: 'Science', type: 'mcq', count: 10 }], exclude_used_within_days: 30 }
+export const assembleExam = async (request) => {
+    const response = await fetch(`${API_URL}/exams/assemble`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(request)
+    });
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || 'Failed to assemble exam');
+    }
+    return response.json();
+};
+
+// Sends every answer of an exam attempt in one request; the server grades it
+// and records it for the signed-in student
+export const submitAttempt = async (attempt) => {
+    const response = await fetch(`${API_URL}/attempts`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+        },
+        body: JSON.stringify(attempt)
+    });
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || 'Failed to submit attempt');
+    }
+    return response.json();
+};
+
 export const getExam = async (id) => {
     const response = await fetch(`${API_URL}/exams/${id}`);
     if (!response.ok) throw new Error('Failed to fetch exam');
@@ -126,6 +213,7 @@ export const generateSlides = async (payload) => {
     } else {
         const formData = new FormData();
         if (payload.text) formData.append('text', payload.text);
+        if (payload.fullDocument) formData.append('full_document', 'true');
         body = formData;
     }
 